@@ -26,52 +26,1376 @@ The @cached decorator.
 """
 __all__ = ['cached']
 
-from inspect import getargspec
-
-from decorator import decorator
+import re
+import sys
+import time
+import pickle
+import sqlite3
+import threading
+import weakref
+from bisect import bisect_left
+try:
+    from inspect import signature, Parameter
+except ImportError: # Python 2
+    from inspect import getargspec
+    signature = None
+else:
+    _kinds = {
+      Parameter.POSITIONAL_ONLY: 'positional_only',
+      Parameter.POSITIONAL_OR_KEYWORD: 'positional',
+      Parameter.VAR_POSITIONAL: 'varargs',
+      Parameter.KEYWORD_ONLY: 'keyword_only',
+      Parameter.VAR_KEYWORD: 'varkw',
+      }
+# can positional-only parameters be defined in generated source?
+_POSITIONAL_ONLY_SYNTAX = sys.version_info >= (3, 8)
+try:
+    from inspect import iscoroutinefunction
+except ImportError: # Python < 3.5
+    def iscoroutinefunction(func):
+        return False
+try:
+    from inspect import markcoroutinefunction
+except ImportError: # Python < 3.12
+    markcoroutinefunction = None
+try:
+    import asyncio
+except ImportError: # Python 2
+    asyncio = None
+try:
+    from collections.abc import MutableMapping
+except ImportError: # Python 2
+    from collections import MutableMapping
 
 from ._common import *
+from ._simpledict import issimpledict, _simpledictitems
 
 
-def cached(func):
-    argspec = getargspec(func)
-    if not argspec.keywords:
-        nargs = len(argspec.args)
-        varargs = argspec.varargs
-        if not nargs and not varargs:
-            def cached(func):
-                try:
-                    return wrapper.result
-                except AttributeError:
-                    result = wrapper.result = func()
-                    return result
+CacheInfo = namedtuple(
+  'CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
 
-            wrapper = decorator(cached, func)
-            return wrapper
 
-        if nargs == 1 and not varargs:
-            def cached(func, arg):
-                try:
-                    return wrapper.results[arg]
-                except KeyError:
-                    result = wrapper.results[arg] = func(arg)
-                    return result
+CacheReport = namedtuple('CacheReport', [
+  'name', 'hits', 'misses', 'ratio', 'evictions', 'maxsize', 'currsize',
+  'latencies', 'memory', 'hotkeys'])
+
+
+class CacheStats(object):
+    """The counters of a @cached function wrapper.
+
+    - `latencies` is a histogram of miss computation times
+      with upper bucket bounds from `bounds` (in seconds).
+    - `hotkeys` counts hits per key if enabled with a number of keys
+      to report. It is pruned to the most frequent ones
+      when it gets much larger than that, so counts are approximate.
+    """
+    __slots__ = ['hits', 'misses', 'latencies', 'hotkeys', 'nhotkeys']
+
+    bounds = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1, 1.0, 10.0, float('inf'))
+
+    def __init__(self, hotkeys=None):
+        self.hits = self.misses = 0
+        self.latencies = [0] * len(self.bounds)
+        self.nhotkeys = hotkeys
+        self.hotkeys = Counter() if hotkeys is not None else None
+
+    def latency(self, seconds):
+        """Count a miss computation time in the `latencies` histogram.
+        """
+        self.latencies[bisect_left(self.bounds, seconds)] += 1
+        hotkeys = self.hotkeys
+        if hotkeys is not None and len(hotkeys) > 64 * self.nhotkeys:
+            hot = hotkeys.most_common(8 * self.nhotkeys)
+            hotkeys.clear()
+            hotkeys.update(dict(hot))
+
+
+class BoundedResults(MutableMapping):
+    """Base class for size-bounded @cached result storages.
+
+    - Evicts one entry via :meth:`_evict` for every new key
+      inserted beyond `maxsize` and counts that in `.evictions`.
+    - A `maxsize` of ``0`` stores nothing at all.
+    - `lockfree_reads` tells if item lookups leave the storage unchanged,
+      so that @cached(threadsafe=True) can skip locking on hits.
+    """
+    lockfree_reads = True
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._data = OrderedDict()
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        data = self._data
+        if key not in data:
+            if not self.maxsize:
+                return
+            if len(data) >= self.maxsize:
+                self._evict()
+                self.evictions += 1
+        data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+    def _evict(self):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '%s(%s, maxsize=%s)' % (
+          type(self).__name__, repr(dict(self._data)), self.maxsize)
+
+
+class FIFOResults(BoundedResults):
+    """Evicts the oldest inserted @cached result first.
+    """
+    def _evict(self):
+        self._data.popitem(last=False)
+
+
+if PY2:
+    def _move_to_end(odict, key):
+        odict[key] = odict.pop(key)
+else:
+    _move_to_end = OrderedDict.move_to_end
+
+
+class LRUResults(BoundedResults):
+    """Evicts the least recently accessed @cached result first.
+    """
+    lockfree_reads = False
+
+    def __getitem__(self, key):
+        data = self._data
+        value = data[key]
+        _move_to_end(data, key)
+        return value
+
+    def __setitem__(self, key, value):
+        BoundedResults.__setitem__(self, key, value)
+        if key in self._data:
+            _move_to_end(self._data, key)
+
+    def _evict(self):
+        self._data.popitem(last=False)
+
+
+class LFUResults(BoundedResults):
+    """Evicts the least frequently accessed @cached result first,
+       and the oldest one of those if there are several.
+
+    - Keeps the keys in insertion ordered buckets per access count
+      and remembers the lowest count for O(1) eviction.
+    """
+    lockfree_reads = False
+
+    def __init__(self, maxsize):
+        BoundedResults.__init__(self, maxsize)
+        self._counts = {}
+        self._buckets = defaultdict(OrderedDict)
+        self._mincount = 0
+
+    def __getitem__(self, key):
+        value = self._data[key]
+        self._touch(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._data:
+            self._data[key] = value
+            self._touch(key)
+            return
+        BoundedResults.__setitem__(self, key, value)
+        if key in self._data:
+            self._counts[key] = 1
+            self._buckets[1][key] = None
+            self._mincount = 1
+
+    def __delitem__(self, key):
+        del self._data[key]
+        self._unlink(key, self._counts.pop(key))
+
+    def clear(self):
+        self._data.clear()
+        self._counts.clear()
+        self._buckets.clear()
+        self._mincount = 0
+
+    def _unlink(self, key, count):
+        bucket = self._buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[count]
+            if self._mincount == count:
+                self._mincount = count + 1
+
+    def _touch(self, key):
+        count = self._counts[key]
+        self._unlink(key, count)
+        self._counts[key] = count + 1
+        self._buckets[count + 1][key] = None
+
+    def _evict(self):
+        bucket = self._buckets[self._mincount]
+        key = bucket.popitem(last=False)[0]
+        if not bucket:
+            del self._buckets[self._mincount]
+        del self._counts[key]
+        del self._data[key]
+
+
+class LockedResults(MutableMapping):
+    """Serializes all access to another @cached result storage
+       with a lock, for storages without `lockfree_reads`.
+    """
+    lockfree_reads = True
+
+    def __init__(self, results):
+        self.results = results
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.results, name)
+
+    def __getitem__(self, key):
+        with self._lock:
+            return self.results[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self.results[key] = value
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self.results[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.results
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self.results))
+
+    def __len__(self):
+        return len(self.results)
+
+    def clear(self):
+        with self._lock:
+            self.results.clear()
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, repr(self.results))
+
+
+class Flight(object):
+    """A pending computation of a @cached(threadsafe=True) result,
+       which concurrent callers of the same key can :meth:`wait` for.
+    """
+    __slots__ = ['_event', '_result', '_exc_info']
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._exc_info = None
+
+    def finish(self, result):
+        self._result = result
+        self._event.set()
+
+    def fail(self, exc_info):
+        self._exc_info = exc_info
+        self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        if self._exc_info is not None:
+            reraise(*self._exc_info)
+        return self._result
+
+
+class SQLiteResults(MutableMapping):
+    """A persistent @cached result storage in an SQLite database file.
+
+    - Survives process restarts
+      and can be shared by several processes on the same host.
+    - Each storage uses its own table `name` in the database,
+      so several @cached functions can share one file.
+    - Keys and values are encoded with ``serializer.dumps()``
+      and decoded with ``serializer.loads()``,
+      so any module like `pickle`, `json` or `marshal` can be used.
+      Keys must encode deterministically (so no sets),
+      to be found again by other processes.
+    - All access is serialized with an internal lock
+      and can be done from any thread.
+    """
+    lockfree_reads = True
+
+    _re_name = re.compile('^[A-Za-z_][A-Za-z0-9_]*$')
+
+    def __init__(
+      self, path, name='results', serializer=pickle, timeout=30.0,
+      ):
+        if not self._re_name.match(name):
+            raise ValueError(
+              "Invalid SQLiteResults table name %s" % repr(name))
+        self.path = path
+        self.name = name
+        self.serializer = serializer
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+          path, timeout=timeout, isolation_level=None,
+          check_same_thread=False)
+        if path != ':memory:':
+            self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+          'CREATE TABLE IF NOT EXISTS "%s" '
+          '(key BLOB PRIMARY KEY, value BLOB)' % name)
+
+    def _encode(self, obj):
+        data = self.serializer.dumps(obj)
+        if isinstance(data, binary_type):
+            return sqlite3.Binary(data)
+        return data
+
+    def _decode(self, data):
+        if not isinstance(data, text_type):
+            data = binary_type(data)
+        return self.serializer.loads(data)
+
+    def _execute(self, sql, *params):
+        with self._lock:
+            return self._db.execute(sql % self.name, params).fetchall()
+
+    def __getitem__(self, key):
+        rows = self._execute(
+          'SELECT value FROM "%s" WHERE key = ?', self._encode(key))
+        if not rows:
+            raise KeyError(key)
+        return self._decode(rows[0][0])
+
+    def __setitem__(self, key, value):
+        self._execute(
+          'INSERT OR REPLACE INTO "%s" (key, value) VALUES (?, ?)',
+          self._encode(key), self._encode(value))
+
+    def __delitem__(self, key):
+        encoded = self._encode(key)
+        with self._lock:
+            if not self._execute(
+              'SELECT 1 FROM "%s" WHERE key = ?', encoded):
+                raise KeyError(key)
+            self._execute('DELETE FROM "%s" WHERE key = ?', encoded)
+
+    def __contains__(self, key):
+        return bool(self._execute(
+          'SELECT 1 FROM "%s" WHERE key = ?', self._encode(key)))
+
+    def __iter__(self):
+        for (key, ) in self._execute('SELECT key FROM "%s"'):
+            yield self._decode(key)
+
+    def __len__(self):
+        return self._execute('SELECT COUNT(*) FROM "%s"')[0][0]
+
+    def clear(self):
+        self._execute('DELETE FROM "%s"')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __repr__(self):
+        return '%s(%s, %s)' % (
+          type(self).__name__, repr(self.path), repr(self.name))
+
+
+class CachedFuture(object):
+    """The cached result of a @cached coroutine function call.
+
+    - Wraps the future of the one running or finished computation
+      and can be awaited any number of times by concurrent callers.
+    - Every ``await`` is shielded, so cancelling one awaiter
+      doesn't cancel the computation for the others.
+    """
+    __slots__ = ['future']
+
+    def __init__(self, future):
+        self.future = future
+
+    def __await__(self):
+        return asyncio.shield(self.future).__await__()
+
+    __iter__ = __await__ # for `yield from` in generator-based coroutines
+
+    def done(self):
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, repr(self.future))
+
+
+_monotonic = getattr(time, 'monotonic', time.time)
+_perf_counter = getattr(time, 'perf_counter', _monotonic)
+
+
+class ExpiringResults(MutableMapping):
+    """Adds per-entry expiry after `ttl` seconds
+       to another @cached result storage.
+
+    - Expired entries are lazily purged when accessed,
+      on every insertion and before counting,
+      or explicitly with :meth:`purge`.
+    - As all entries share the same `ttl`,
+      insertion order is also expiry order,
+      so purging only needs to look at the oldest entries.
+    - Counts purged entries in `.expirations`.
+    """
+    def __init__(self, results, ttl, timer=_monotonic):
+        self.results = results
+        self.ttl = ttl
+        self.timer = timer
+        self.expirations = 0
+        self._expires = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def maxsize(self):
+        return getattr(self.results, 'maxsize', None)
+
+    @property
+    def lockfree_reads(self):
+        return getattr(self.results, 'lockfree_reads', True)
+
+    @property
+    def evictions(self):
+        return getattr(self.results, 'evictions', 0)
+
+    def __getitem__(self, key):
+        if self._expires[key] <= self.timer():
+            with self._lock:
+                self._expire(key)
+            raise KeyError(key)
+        return self.results[key]
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._purge(self.timer())
+            self.results[key] = value
+            expires = self._expires
+            expires.pop(key, None)
+            expires[key] = self.timer() + self.ttl
+
+    def __delitem__(self, key):
+        with self._lock:
+            del self.results[key]
+            self._expires.pop(key, None)
+
+    def __contains__(self, key):
+        try:
+            expires = self._expires[key]
+        except KeyError:
+            return False
+        return expires > self.timer() and key in self.results
+
+    def __iter__(self):
+        now = self.timer()
+        expires = self._expires
+        return (key for key in list(self.results)
+                if expires.get(key, now) > now)
+
+    def __len__(self):
+        with self._lock:
+            self._purge(self.timer())
+            return len(self.results)
+
+    def clear(self):
+        with self._lock:
+            self.results.clear()
+            self._expires.clear()
+
+    def purge(self):
+        """Remove all expired entries.
+        """
+        with self._lock:
+            self._purge(self.timer())
+
+    def _purge(self, now):
+        expires = self._expires
+        results = self.results
+        while expires:
+            key = next(iter(expires))
+            if expires[key] > now:
+                break
+            del expires[key]
+            # could already be evicted from bounded results
+            if key in results:
+                del results[key]
+                self.expirations += 1
+
+    def _expire(self, key):
+        expires = self._expires
+        if key in expires and expires[key] <= self.timer():
+            del expires[key]
+            if key in self.results:
+                del self.results[key]
+                self.expirations += 1
+
+    def __repr__(self):
+        return '%s(%s, ttl=%s)' % (
+          type(self).__name__, repr(self.results), self.ttl)
+
+
+def _sweep(ref, interval):
+    """Periodically purge the :class:`ExpiringResults` behind weak `ref`
+       until it gets garbage collected.
+    """
+    wait = threading.Event().wait
+    while True:
+        wait(interval)
+        results = ref()
+        if results is None:
+            return
+        results.purge()
+        del results
+
+
+def _parameters(func):
+    """Get a list of ``(name, kind, default)`` tuples
+       describing the parameters of `func`.
+
+    - `kind` is one of ``'positional'``, ``'positional_only'``,
+      ``'varargs'``, ``'keyword_only'`` and ``'varkw'``.
+    - `default` is :class:`_NoDefault` for parameters without default.
+    - Callables without introspectable signature get
+      ``(*args, **kwargs)`` parameters, and so do callables
+      with positional-only parameters (like builtins)
+      if the Python version has no syntax for them (before 3.8).
+    """
+    if signature is not None:
+        try:
+            sig = signature(func)
+        except (TypeError, ValueError):
+            return [('args', 'varargs', _NoDefault),
+                    ('kwargs', 'varkw', _NoDefault)]
+
+        parameters = [(param.name, _kinds[param.kind],
+                       _NoDefault if param.default is param.empty
+                       else param.default)
+                      for param in sig.parameters.values()]
+        if not _POSITIONAL_ONLY_SYNTAX and any(
+          kind == 'positional_only' for _, kind, _ in parameters):
+            return [('args', 'varargs', _NoDefault),
+                    ('kwargs', 'varkw', _NoDefault)]
+
+        return parameters
+
+    try:
+        argspec = getargspec(func)
+    except TypeError:
+        return [('args', 'varargs', _NoDefault),
+                ('kwargs', 'varkw', _NoDefault)]
+
+    defaults = argspec.defaults or ()
+    parameters = [
+      (name, 'positional', _NoDefault) for name in argspec.args]
+    for index, default in enumerate(defaults, len(parameters) - len(defaults)):
+        parameters[index] = (parameters[index][0], 'positional', default)
+    if argspec.varargs:
+        parameters.append((argspec.varargs, 'varargs', _NoDefault))
+    if argspec.keywords:
+        parameters.append((argspec.keywords, 'varkw', _NoDefault))
+    return parameters
+
+
+class _NoDefault(object):
+    pass
+
+
+class _Freezing(object):
+    pass
+
+
+def _freeze(obj, memo):
+    """Recursively convert `obj` to a hashable structure,
+       which compares equal for structurally equal objects.
+
+    - Lists, dicts, sets and simpledict instances (via their ``__dict__``)
+      get tagged with their basic type,
+      so that ``[1]`` and ``(1, )`` don't result in equal structures.
+    - Tuples are converted item by item.
+    - All other objects are left as they are.
+    - `memo` maps ids of already converted objects to their results,
+      to convert objects occurring several times only once.
+    """
+    if obj is None or isinstance(
+      obj, string_types + integer_types + (binary_type, float, bool)):
+        return obj
+
+    memo_id = id(obj)
+    try:
+        frozen = memo[memo_id]
+    except KeyError:
+        pass
+    else:
+        if frozen is _Freezing:
+            raise ValueError(
+              "@cached(structural=True) can't freeze recursive %s"
+              % repr(type(obj)))
+        return frozen
+
+    memo[memo_id] = _Freezing
+    if isinstance(obj, tuple):
+        frozen = tuple(_freeze(item, memo) for item in obj)
+    elif isinstance(obj, list):
+        frozen = (list, tuple(_freeze(item, memo) for item in obj))
+    elif isinstance(obj, dict):
+        frozen = (dict, frozenset(
+          (_freeze(key, memo), _freeze(value, memo))
+          for key, value in obj.items()))
+    elif isinstance(obj, (set, frozenset)):
+        frozen = (frozenset, frozenset(_freeze(item, memo) for item in obj))
+    elif issimpledict(obj):
+        frozen = (type(obj), frozenset(
+          (_freeze(key, memo), _freeze(value, memo))
+          for key, value in _simpledictitems(obj)))
+    else:
+        frozen = obj
+    memo[memo_id] = frozen
+    return frozen
+
+
+def _structuralkey(key):
+    """Convert a @cached(structural=True) `key` with :func:`_freeze`.
+    """
+    return _freeze(key, {})
+
+
+# generated source --> compiled factory of @cached wrappers,
+# shared by all functions with the same parameter layout
+_factories = {}
+
+
+def _compiler(parameters, hotkeys=False, freeze=None):
+    """Get a function creating @cached wrappers
+       with exactly the same `parameters`,
+       taking the wrapped function, the results storage,
+       the :class:`CacheStats` and the miss handler.
+
+    - Python itself then binds call arguments to parameters,
+      so positional and keyword calls result in the same cache key,
+      built directly from the parameter values:
+
+      - The single value for single positional parameter functions.
+      - A tuple of all values for other functions.
+      - A pair of such a tuple and a sorted tuple of ``**kwargs`` items
+        for functions with ``**kwargs``.
+
+    - The key is additionally passed through `freeze` if given.
+    - The key building is also available as ``wrapper.cache_key()``.
+    - The wrapper looks up `results` and counts `stats`
+      (and hot keys with `hotkeys`) directly
+      and only calls `miss` with the key, args tuple and kwargs dict
+      on cache misses.
+    - The wrapper source is only compiled once per parameter layout
+      into a factory taking all the wrapper's dependencies,
+      so creating many wrappers with one compiler
+      (like per instance by @cached.method) is cheap.
+    """
+    # prefix for all generated names to not clash with parameter names
+    prefix = '_cached'
+    while any(name.startswith(prefix) for name, _, _ in parameters):
+        prefix += '_'
+    # names of the factory arguments
+    dependencies = [
+      prefix + 'results', prefix + 'stats', prefix + 'hotkeys',
+      prefix + 'miss', prefix + 'freeze',
+      ]
+    defaults = []
+    signature = []
+    positional = []
+    keywords = []
+    varargs = varkw = None
+    for index, (name, kind, default) in enumerate(parameters):
+        if kind == 'varargs':
+            signature.append('*' + name)
+            varargs = name
+        elif kind == 'varkw':
+            signature.append('**' + name)
+            varkw = name
         else:
-            def cached(func, *args):
-                try:
-                    return wrapper.results[args]
+            if kind == 'keyword_only':
+                if not keywords and varargs is None:
+                    signature.append('*')
+                keywords.append(name)
+            else:
+                positional.append(name)
+            if default is _NoDefault:
+                signature.append(name)
+            else:
+                dependencies.append('%sdefault%d' % (prefix, index))
+                defaults.append(default)
+                signature.append('%s=%sdefault%d' % (name, prefix, index))
+        if kind == 'positional_only' and (
+          index + 1 == len(parameters)
+          or parameters[index + 1][1] != 'positional_only'):
+            signature.append('/')
+
+    args = '(%s)' % ''.join(name + ', ' for name in positional)
+    if varargs:
+        args += ' + ' + varargs
+    if keywords or varkw:
+        kwargs = '%sdict(%s)' % (prefix, ', '.join(
+          ([varkw] if varkw else [])
+          + ['%s=%s' % (name, name) for name in keywords]))
+    else:
+        kwargs = '{}'
+
+    if len(positional) == 1 and len(parameters) == 1:
+        key = positional[0]
+    else:
+        key = args
+        if keywords:
+            key += ' + (%s)' % ''.join(name + ', ' for name in keywords)
+    if varkw: # only sort if order can differ
+        key = ('(%s, %stuple(%s.items()) if %slen(%s) < 2'
+               ' else %stuple(%ssorted(%s.items())))') % (
+          key, prefix, varkw, prefix, varkw, prefix, prefix, varkw)
+
+    if freeze is not None:
+        key = '%sfreeze(%s)' % (prefix, key)
+
+    source = '\n'.join([
+      'def make(%s):' % ', '.join(dependencies),
+      '    def cached_key(%s):' % ', '.join(signature),
+      '        return %s' % key,
+      '',
+      '    def cached(%s):' % ', '.join(signature),
+      '        %skey = %s' % (prefix, key),
+      '        try:',
+      '            %sresult = %sresults[%skey]' % (prefix, prefix, prefix),
+      '        except %sKeyError:' % prefix,
+      '            return %smiss(%skey, %s, %s)' % (
+        prefix, prefix, args, kwargs),
+      '        %sstats.hits += 1' % prefix,
+      ] + ([
+      '        %shotkeys[%skey] += 1' % (prefix, prefix),
+      ] if hotkeys else []) + [
+      '        return %sresult' % prefix,
+      '',
+      '    return cached, cached_key',
+      ])
+    make = _factories.get(source)
+    if make is None:
+        namespace = {
+          prefix + 'KeyError': KeyError,
+          prefix + 'sorted': sorted,
+          prefix + 'tuple': tuple,
+          prefix + 'dict': dict,
+          prefix + 'len': len,
+          }
+        exec_(compile(source, '<@cached>', 'exec'), namespace)
+        make = _factories[source] = namespace['make']
+
+    def compiler(func, results, stats, miss):
+        wrapper, cache_key = make(
+          results, stats, stats.hotkeys, miss, freeze, *defaults)
+        update_wrapper(wrapper, func)
+        wrapper.__wrapped__ = func
+        wrapper.cache_key = cache_key
+        if markcoroutinefunction is not None and iscoroutinefunction(func):
+            markcoroutinefunction(wrapper)
+        return wrapper
+
+    return compiler
+
+
+def cached(
+  func=None, maxsize=None, policy='lru', ttl=None, sweep=None,
+  threadsafe=False, results=None, hotkeys=None, structural=False,
+  tags=None,
+  ):
+    """Decorator for caching function results by call arguments.
+
+    - Can be used directly as ``@cached``
+      or with options like ``@cached(maxsize=128, policy='lfu')``.
+    - The wrapper is compiled with the same signature as `func`,
+      so positional and keyword calls with the same argument values
+      (including defaults) share one cache entry.
+    - Results are stored in ``wrapper.results``,
+      which is a plain `dict` without `maxsize`,
+      so everything is cached forever by default.
+      The wrapper is bound to that storage object,
+      so it must be modified in place and never be replaced.
+    - With `structural`, unhashable lists, dicts and sets
+      (also nested in tuples and each other)
+      and simpledict instances are converted to hashable structures
+      for the cache keys, so they can be used as arguments.
+      That costs some overhead on every call.
+    - Any other *mapping* can be plugged in as storage backend
+      with `results`, like a persistent :class:`SQLiteResults`
+      (also available as ``cached.SQLiteResults``).
+      It can't be combined with `maxsize`.
+    - With `maxsize`, results are evicted according to `policy`,
+      which can be ``'lru'``, ``'lfu'`` or ``'fifo'``
+      (see ``cached.policies``).
+    - With `ttl`, results expire that many seconds after being stored
+      and ``wrapper.results`` becomes an :class:`ExpiringResults` wrapper.
+      Expired results are purged lazily on access,
+      and additionally every `sweep` seconds by a background thread
+      if given.
+    - With `threadsafe`, concurrent calls missing the same key
+      wait for the first one to compute the result (or exception)
+      instead of calling the function again.
+      Hits don't lock unless the results storage reorders on reads
+      (like ``'lru'`` and ``'lfu'``).
+      Only the miss counter is exact under concurrency.
+    - Coroutine functions get a wrapper returning :class:`CachedFuture`
+      awaitables, which are stored in ``wrapper.results``
+      as soon as the computation starts,
+      so concurrent awaiters of the same key share it.
+      Failed or cancelled computations are removed again.
+      `threadsafe` is not needed, as they all run in one event loop.
+    - ``wrapper.invalidate(*args, **kwargs)`` drops the result
+      for the given call arguments and ``wrapper.clear()`` drops all.
+    - `tags` can be a function taking the same arguments as `func`
+      and returning tags for the result of each call.
+      ``cached.invalidate_tag(tag)`` then drops all results
+      of all @cached wrappers with that tag.
+    - ``wrapper.cache_info()`` returns a :class:`CacheInfo` tuple
+      of hits, misses, evictions, maxsize and current size.
+    - ``wrapper.cache_stats()`` returns a more detailed
+      :class:`CacheReport`, including a histogram of miss latencies,
+      a shallow memory estimate of the results in bytes
+      (None if the storage can't tell)
+      and with `hotkeys` the top that many most hit keys.
+      ``cached.stats()`` reports all live @cached wrappers.
+    """
+    if func is None:
+        return partial(
+          cached, maxsize=maxsize, policy=policy, ttl=ttl, sweep=sweep,
+          threadsafe=threadsafe, results=results, hotkeys=hotkeys,
+          structural=structural, tags=tags)
+
+    return _cached(
+      func, _parameters(func), {}, maxsize=maxsize, policy=policy, ttl=ttl,
+      sweep=sweep, threadsafe=threadsafe, results=results, hotkeys=hotkeys,
+      structural=structural, tags=tags)
+
+
+def _cached(
+  func, parameters, compilers, maxsize=None, policy='lru', ttl=None,
+  sweep=None, threadsafe=False, results=None, hotkeys=None,
+  structural=False, tags=None,
+  ):
+    """Create a @cached wrapper for `func` with `parameters`.
+
+    - `compilers` is a dict for reusing the :func:`_compiler`
+      of wrappers with the same parameters and options.
+    """
+    if results is not None:
+        if maxsize is not None:
+            raise ValueError(
+              "@cached maxsize can't be combined with custom results")
+        if iscoroutinefunction(func):
+            raise ValueError(
+              "@cached coroutine functions don't support custom results")
+    elif maxsize is not None:
+        try:
+            resultstype = cached.policies[policy]
+        except KeyError:
+            raise ValueError(
+              "Unknown @cached policy %s. Use one of: %s" % (
+                repr(policy), ", ".join(map(repr, sorted(cached.policies)))))
+    if hotkeys is not None and hotkeys < 1:
+        raise ValueError(
+          "@cached hotkeys must be a positive number of keys to report")
+    stats = CacheStats(hotkeys)
+
+    if iscoroutinefunction(func):
+        def miss(key, args, kwargs):
+            stats.misses += 1
+            future = asyncio.ensure_future(func(*args, **kwargs))
+            result = results[key] = CachedFuture(future)
+            if tags is not None:
+                tagindex.add(key, tags(*args, **kwargs))
+            future.add_done_callback(
+              partial(landed, key, result, _perf_counter()))
+            return result
+
+        def landed(key, result, start, future):
+            stats.latency(_perf_counter() - start)
+            if future.cancelled() or future.exception() is not None:
+                if results.get(key) is result:
+                    del results[key]
+
+    elif threadsafe:
+        lock = threading.Lock()
+        flights = {}
+
+        def miss(key, args, kwargs):
+            with lock:
+                try: # computed in the meantime?
+                    result = results[key]
                 except KeyError:
-                    result = wrapper.results[args] = func(*args)
+                    pass
+                else:
+                    stats.hits += 1
                     return result
+
+                flight = flights.get(key)
+                owner = flight is None
+                if owner:
+                    flight = flights[key] = Flight()
+                    stats.misses += 1
+            if not owner:
+                return flight.wait()
+
+            start = _perf_counter()
+            try:
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    stats.latency(_perf_counter() - start)
+                if tags is not None:
+                    resulttags = tags(*args, **kwargs)
+                with lock:
+                    results[key] = result
+                    del flights[key]
+                if tags is not None:
+                    tagindex.add(key, resulttags)
+            except BaseException:
+                # waiters must never be left hanging, whichever step failed
+                with lock:
+                    if flights.get(key) is flight:
+                        del flights[key]
+                flight.fail(sys.exc_info())
+                raise
+            flight.finish(result)
+            return result
     else:
-        def cached(func, *args, **kwargs):
-            key = args, frozenset(kwargs.items())
+        def miss(key, args, kwargs):
+            stats.misses += 1
+            start = _perf_counter()
+            try:
+                result = results[key] = func(*args, **kwargs)
+            finally:
+                stats.latency(_perf_counter() - start)
+            if tags is not None:
+                tagindex.add(key, tags(*args, **kwargs))
+            return result
+
+    if not parameters and maxsize != 0 and ttl is None and not threadsafe \
+      and tags is None and results is None \
+      and not iscoroutinefunction(func):
+        def wrapper():
             try:
-                return wrapper.results[key]
-            except KeyError:
-                result = wrapper.results[key] = func(*args, **kwargs)
+                result = wrapper.result
+            except AttributeError:
+                stats.misses += 1
+                start = _perf_counter()
+                try:
+                    result = wrapper.result = func()
+                finally:
+                    stats.latency(_perf_counter() - start)
                 return result
+            stats.hits += 1
+            return result
+
+        def cache_info():
+            return CacheInfo(
+              stats.hits, stats.misses, 0, maxsize,
+              int(hasattr(wrapper, 'result')))
+
+        def memory():
+            try:
+                return sys.getsizeof(wrapper.result)
+            except AttributeError:
+                return 0
+
+        def invalidate():
+            try:
+                del wrapper.result
+            except AttributeError:
+                return False
+            return True
+
+        def clear():
+            invalidate()
+
+        update_wrapper(wrapper, func)
+        wrapper.__wrapped__ = func
+        wrapper.invalidate = invalidate
+        wrapper.clear = clear
+        wrapper.cache_info = cache_info
+        wrapper.cache_stats = partial(_report, wrapper, stats, memory)
+        _registry.add(wrapper)
+        return wrapper
+
+    if results is None:
+        if maxsize is None:
+            results = {}
+        else:
+            results = resultstype(maxsize)
+    if threadsafe and not getattr(results, 'lockfree_reads', True):
+        results = LockedResults(results)
+    if ttl is not None:
+        results = ExpiringResults(results, ttl)
+        if sweep:
+            sweeper = threading.Thread(
+              target=_sweep, args=(weakref.ref(results), sweep),
+              name='cached-sweep-%s' % func.__name__)
+            sweeper.daemon = True
+            sweeper.start()
+
+    tagindex = TagIndex(results)
+
+    def cache_info():
+        return CacheInfo(
+          stats.hits, stats.misses, getattr(results, 'evictions', 0),
+          maxsize, len(results))
+
+    def invalidate(*args, **kwargs):
+        key = wrapper.cache_key(*args, **kwargs)
+        tagindex.discard(key)
+        try:
+            del results[key]
+        except KeyError:
+            return False
+        return True
 
-    wrapper = decorator(cached, func)
-    wrapper.results = {}
+    def clear():
+        tagindex.clear()
+        results.clear()
+
+    compiler = compilers.get('compiler')
+    if compiler is None:
+        compiler = compilers['compiler'] = _compiler(
+          parameters, hotkeys is not None,
+          freeze=structural and _structuralkey or None)
+    wrapper = compiler(func, results, stats, miss)
+    wrapper.results = results
+    wrapper.invalidate = invalidate
+    wrapper.clear = clear
+    wrapper.cache_info = cache_info
+    wrapper.cache_stats = partial(
+      _report, wrapper, stats, partial(_memory, results))
+    _registry.add(wrapper)
     return wrapper
+
+
+_registry = weakref.WeakSet()
+
+
+class TagIndex(object):
+    """Maps the tags of a @cached wrapper's results to their keys
+       and the other way around, for invalidation by tag.
+
+    - All indexes with results for a tag are registered globally,
+      so that :func:`invalidatetag` only touches affected entries.
+    - Keys of results that got evicted or expired in the meantime
+      are pruned whenever the index grows much larger than the results.
+    """
+    _lock = threading.RLock()
+    _indexes = {} # tag --> WeakSet of TagIndex instances
+
+    def __init__(self, results):
+        self.results = results
+        self._keys = {}
+        self._tags = {}
+
+    def add(self, key, tags):
+        indexes = self._indexes
+        with self._lock:
+            self.discard(key)
+            tags = self._tags[key] = frozenset(tags)
+            for tag in tags:
+                self._keys.setdefault(tag, set()).add(key)
+                indexes.setdefault(tag, weakref.WeakSet()).add(self)
+            if len(self._tags) > 2 * len(self.results) + 64:
+                for key in [key for key in self._tags
+                            if key not in self.results]:
+                    self.discard(key)
+
+    def discard(self, key):
+        with self._lock:
+            for tag in self._tags.pop(key, ()):
+                keys = self._keys[tag]
+                keys.discard(key)
+                if not keys:
+                    self._unregister(tag)
+
+    def invalidate(self, tag):
+        """Drop all results with `tag` and return their number.
+        """
+        count = 0
+        with self._lock:
+            for key in list(self._keys.get(tag, ())):
+                self.discard(key)
+                try:
+                    del self.results[key]
+                except KeyError: # already evicted
+                    pass
+                else:
+                    count += 1
+        return count
+
+    def clear(self):
+        with self._lock:
+            for tag in list(self._keys):
+                self._unregister(tag)
+            self._tags.clear()
+
+    def _unregister(self, tag):
+        del self._keys[tag]
+        indexes = self._indexes.get(tag)
+        if indexes is not None:
+            indexes.discard(self)
+            if not indexes:
+                del self._indexes[tag]
+
+
+def invalidatetag(tag):
+    """Drop the results of all @cached wrappers tagged with `tag`.
+
+    - Returns the number of dropped results.
+    """
+    with TagIndex._lock:
+        indexes = list(TagIndex._indexes.get(tag, ()))
+        return sum(index.invalidate(tag) for index in indexes)
+
+
+def _report(wrapper, stats, memory):
+    """Create a :class:`CacheReport` for @cached `wrapper`.
+    """
+    info = wrapper.cache_info()
+    calls = info.hits + info.misses
+    hotkeys = stats.hotkeys
+    return CacheReport(
+      name='%s.%s' % (
+        wrapper.__module__,
+        getattr(wrapper, '__qualname__', wrapper.__name__)),
+      hits=info.hits, misses=info.misses,
+      ratio=calls and float(info.hits) / calls,
+      evictions=info.evictions, maxsize=info.maxsize,
+      currsize=info.currsize,
+      latencies=tuple(zip(stats.bounds, stats.latencies)),
+      memory=memory(),
+      hotkeys=hotkeys is not None
+        and hotkeys.most_common(stats.nhotkeys) or [])
+
+
+def _memory(results):
+    """Estimate the shallow size of all keys and values in `results`.
+
+    - Returns None for storages not based on a `dict`.
+    """
+    size = 0
+    while not isinstance(results, dict):
+        size += sys.getsizeof(results)
+        try:
+            results = results._data
+        except AttributeError:
+            try:
+                results = results.results
+            except AttributeError:
+                return None
+    size += sys.getsizeof(results)
+    try:
+        items = list(results.items())
+    except RuntimeError: # changed size during iteration by another thread
+        return None
+    for key, value in items:
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+def cachedstats(callback=None):
+    """Get a list of :class:`CacheReport` tuples
+       for all live @cached wrappers.
+
+    - Also passes each report to `callback` if given,
+      for pushing them to some metrics system.
+    """
+    reports = [wrapper.cache_stats() for wrapper in list(_registry)]
+    if callback is not None:
+        for report in reports:
+            callback(report)
+    return reports
+
+
+def cachedpublish(callback, interval):
+    """Pass all ``cached.stats()`` reports to `callback`
+       every `interval` seconds from a background thread.
+
+    - Returns a function to stop publishing.
+    """
+    stop = threading.Event()
+
+    def publish():
+        while not stop.wait(interval):
+            cachedstats(callback)
+
+    thread = threading.Thread(target=publish, name='cached-publish')
+    thread.daemon = True
+    thread.start()
+    return stop.set
+
+
+class CachedMethod(object):
+    """The descriptor created by the ``@cached.method`` decorator.
+
+    - Creates a separate @cached wrapper with separate results
+      for every instance on first access,
+      which only weakly references the instance,
+      so the instance (and its results) can be garbage collected.
+    - Stores it in the instance ``__dict__`` under the method name,
+      so later accesses don't even call this descriptor.
+      Instances without ``__dict__`` get it from a weak-keyed table.
+    - Instances must be weakly referenceable,
+      so classes with ``__slots__`` need a ``'__weakref__'`` slot.
+    """
+    def __init__(self, func, options):
+        self.func = func
+        self.options = options
+        self.name = func.__name__
+        self._instances = weakref.WeakKeyDictionary()
+        # the parameters of all bound methods, without `self`
+        parameters = _parameters(func)
+        if parameters and parameters[0][1] != 'varargs':
+            parameters = parameters[1:]
+        self._parameters = parameters
+        self._signature = None
+        if signature is not None:
+            try:
+                sig = signature(func)
+            except (TypeError, ValueError):
+                pass
+            else:
+                params = list(sig.parameters.values())
+                if params and params[0].kind != params[0].VAR_POSITIONAL:
+                    params = params[1:]
+                self._signature = sig.replace(parameters=params)
+        # for compiling the wrapper source only once
+        self._compilers = {}
+        update_wrapper(self, func)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            return self._instances[instance]
+        except (KeyError, TypeError):
+            pass
+        try:
+            method = _weakmethod(self.func, instance, self._signature)
+        except TypeError:
+            raise TypeError(
+              "@cached.method needs weakly referenceable instances, not %s"
+              " (add '__weakref__' to __slots__)" % repr(type(instance)))
+        wrapper = _cached(
+          method, self._parameters, self._compilers, **self.options)
+        try:
+            instance.__dict__[self.name] = wrapper
+        except AttributeError:
+            self._instances[instance] = wrapper
+        return wrapper
+
+
+def _weakmethod(func, instance, sig=None):
+    """Bind `func` to only weakly referenced `instance`.
+
+    - `sig` is the signature of the bound method without `self`.
+    """
+    ref = weakref.ref(instance)
+
+    def method(*args, **kwargs):
+        return func(ref(), *args, **kwargs)
+
+    update_wrapper(method, func)
+    if sig is not None:
+        method.__signature__ = sig
+    return method
+
+
+def cachedmethod(func=None, **options):
+    """The ``@cached.method`` decorator for caching results per instance.
+
+    - Takes the same options as @cached.
+    - ``instance.method.results`` and ``instance.method.cache_info()``
+      are also per instance.
+    """
+    if func is None:
+        return partial(cachedmethod, **options)
+    return CachedMethod(func, options)
+
+
+class CachedProperty(object):
+    """The ``@cached.property`` decorator.
+
+    - Calls the decorated getter only on first access per instance
+      and stores the result in the instance ``__dict__``
+      under the property name,
+      which then directly shadows this non-data descriptor.
+    - Delete the instance attribute to recompute.
+    """
+    def __init__(self, func):
+        self.func = func
+        self.name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        try:
+            __dict__ = instance.__dict__
+        except AttributeError:
+            raise TypeError(
+              "@cached.property needs instances with __dict__, not %s"
+              % repr(type(instance)))
+        value = __dict__[self.name] = self.func(instance)
+        return value
+
+
+cached.policies = {
+  'lru': LRUResults,
+  'lfu': LFUResults,
+  'fifo': FIFOResults,
+  }
+
+cached.method = cachedmethod
+cached.property = CachedProperty
+
+cached.invalidate_tag = invalidatetag
+cached.stats = cachedstats
+cached.publish = cachedpublish
+
+cached.CacheInfo = CacheInfo
+cached.CacheReport = CacheReport
+cached.SQLiteResults = SQLiteResults
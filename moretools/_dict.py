@@ -30,7 +30,9 @@ which also work with simpledict instances.
 __all__ = ['dictkeys', 'dictvalues', 'dictitems', 'dictupdate', 'dictfilter']
 
 from ._undefined import undefined
-from ._simpledict import issimpledict
+from ._simpledict import (
+  issimpledict, SimpleDictFieldsType, SimpleFrozenDictType,
+  _simpledictitems)
 from ._types import isdict
 
 import six
@@ -43,6 +45,8 @@ def dictkeys(obj):
     """
     if not isdict(obj):
         raise TypeError("dictkeys() arg must be a dictionary")
+    if isinstance(obj, (SimpleDictFieldsType, SimpleFrozenDictType)):
+        return (key for key, _ in _simpledictitems(obj))
     if issimpledict(obj):
         obj = obj.__dict__
     return six.iterkeys(obj)
@@ -55,6 +59,8 @@ def dictvalues(obj):
     """
     if not isdict(obj):
         raise TypeError("dictvalues() arg must be a dictionary")
+    if isinstance(obj, (SimpleDictFieldsType, SimpleFrozenDictType)):
+        return (value for _, value in _simpledictitems(obj))
     if issimpledict(obj):
         obj = obj.__dict__
     return six.itervalues(obj)
@@ -68,6 +74,8 @@ def dictitems(obj):
     """
     if not isdict(obj):
         raise TypeError("dictitems() arg must be a dictionary")
+    if isinstance(obj, (SimpleDictFieldsType, SimpleFrozenDictType)):
+        return _simpledictitems(obj)
     if issimpledict(obj):
         obj = obj.__dict__
     return six.iteritems(obj)
@@ -82,13 +90,17 @@ def dictupdate(obj, mapping=None, **items):
     if not isdict(obj):
         raise TypeError("dictupdate() arg must be a dictionary")
     if issimpledict(obj):
-        dict_ = obj.__dict__
-    else:
-        dict_ = obj
+        if mapping is not None:
+            items = dict(mapping, **items)
+        # item assignment validates the keys, checks any fixed schema
+        # and notifies dependent structs and multi-simpledicts
+        for key, value in items.items():
+            obj[key] = value
+        return obj
     if mapping is None:
-        dict_.update(**items)
+        obj.update(**items)
     else:
-        dict_.update(mapping, **items)
+        obj.update(mapping, **items)
     return obj
 
 
@@ -0,0 +1,324 @@
+# python-moretools
+#
+# many more basic tools for python 2/3
+# extending itertools, functools and operator
+#
+# Copyright (C) 2011-2016 Stefan Zimmermann <zimmermann.code@gmail.com>
+#
+# python-moretools is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# python-moretools is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with python-moretools.  If not, see <http://www.gnu.org/licenses/>.
+
+"""moretools._hamt
+
+A persistent *mapping* type based on a hash array mapped trie.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+__all__ = ['HAMT']
+
+from ._common import *
+
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASHBITS = 64
+_HASHMASK = (1 << _HASHBITS) - 1
+
+
+def _hash(key):
+    return hash(key) & _HASHMASK
+
+
+def _bit(hashvalue, shift):
+    return 1 << ((hashvalue >> shift) & _MASK)
+
+
+try:
+    _popcount = int.bit_count
+except AttributeError: # Python < 3.10
+    def _popcount(value):
+        return bin(value).count('1')
+
+
+def _index(bitmap, bit):
+    return _popcount(bitmap & (bit - 1))
+
+
+class _BitmapNode(object):
+    """A trie node with up to 32 entries,
+       which are (key, value) tuples or sub-nodes,
+       at the positions of the set bits in `bitmap`.
+    """
+    __slots__ = ['bitmap', 'array']
+
+    def __init__(self, bitmap, array):
+        self.bitmap = bitmap
+        self.array = array
+
+    def find(self, shift, hashvalue, key):
+        bit = _bit(hashvalue, shift)
+        if not self.bitmap & bit:
+            raise KeyError(key)
+        entry = self.array[_index(self.bitmap, bit)]
+        if type(entry) is not tuple:
+            return entry.find(shift + _BITS, hashvalue, key)
+        entrykey, value = entry
+        if entrykey is key or entrykey == key:
+            return value
+        raise KeyError(key)
+
+    def assoc(self, shift, hashvalue, key, value):
+        """Get a node with `key` set to `value`
+           and whether the number of entries grew.
+        """
+        bitmap = self.bitmap
+        array = self.array
+        bit = _bit(hashvalue, shift)
+        index = _index(bitmap, bit)
+        if not bitmap & bit:
+            return _BitmapNode(bitmap | bit, (
+              array[:index] + ((key, value), ) + array[index:])), True
+
+        entry = array[index]
+        if type(entry) is not tuple:
+            node, added = entry.assoc(shift + _BITS, hashvalue, key, value)
+            if node is entry:
+                return self, False
+        else:
+            entrykey, entryvalue = entry
+            if entrykey is key or entrykey == key:
+                if entryvalue is value:
+                    return self, False
+                node, added = (key, value), False
+            else:
+                node, added = _pair(
+                  shift + _BITS, _hash(entrykey), entry,
+                  hashvalue, (key, value)), True
+        return _BitmapNode(
+          bitmap, array[:index] + (node, ) + array[index + 1:]), added
+
+    def without(self, shift, hashvalue, key):
+        """Get a node without `key` or ``None`` if empty.
+        """
+        bitmap = self.bitmap
+        array = self.array
+        bit = _bit(hashvalue, shift)
+        if not bitmap & bit:
+            raise KeyError(key)
+        index = _index(bitmap, bit)
+        entry = array[index]
+        if type(entry) is not tuple:
+            node = entry.without(shift + _BITS, hashvalue, key)
+            if node is not None:
+                if type(node) is _BitmapNode and len(node.array) == 1 \
+                  and type(node.array[0]) is tuple:
+                    # pull a single remaining entry up
+                    node = node.array[0]
+                return _BitmapNode(
+                  bitmap, array[:index] + (node, ) + array[index + 1:])
+        elif not (entry[0] is key or entry[0] == key):
+            raise KeyError(key)
+        if len(array) == 1:
+            return None
+        return _BitmapNode(bitmap ^ bit, array[:index] + array[index + 1:])
+
+    def items(self):
+        for entry in self.array:
+            if type(entry) is tuple:
+                yield entry
+            else:
+                for item in entry.items():
+                    yield item
+
+
+class _CollisionNode(object):
+    """A trie node for entries whose keys have the same full hash value.
+    """
+    __slots__ = ['hashvalue', 'array']
+
+    def __init__(self, hashvalue, array):
+        self.hashvalue = hashvalue
+        self.array = array
+
+    def find(self, shift, hashvalue, key):
+        for entrykey, value in self.array:
+            if entrykey is key or entrykey == key:
+                return value
+        raise KeyError(key)
+
+    def assoc(self, shift, hashvalue, key, value):
+        if hashvalue != self.hashvalue:
+            return _BitmapNode(_bit(self.hashvalue, shift), (self, )).assoc(
+              shift, hashvalue, key, value)
+
+        array = self.array
+        for index, (entrykey, entryvalue) in enumerate(array):
+            if entrykey is key or entrykey == key:
+                if entryvalue is value:
+                    return self, False
+                return _CollisionNode(hashvalue, array[:index] + (
+                  (key, value), ) + array[index + 1:]), False
+        return _CollisionNode(hashvalue, array + ((key, value), )), True
+
+    def without(self, shift, hashvalue, key):
+        array = self.array
+        for index, (entrykey, _) in enumerate(array):
+            if entrykey is key or entrykey == key:
+                array = array[:index] + array[index + 1:]
+                if len(array) == 1: # let the parent pull it up
+                    return _BitmapNode(_bit(hashvalue, shift), array)
+                return _CollisionNode(hashvalue, array)
+        raise KeyError(key)
+
+    def items(self):
+        return iter(self.array)
+
+
+def _pair(shift, hashvalue, entry, otherhashvalue, other):
+    """Create a node holding the two (key, value) tuples
+       `entry` and `other` with different keys.
+    """
+    if hashvalue == otherhashvalue:
+        return _CollisionNode(hashvalue, (entry, other))
+
+    bit = _bit(hashvalue, shift)
+    otherbit = _bit(otherhashvalue, shift)
+    if bit == otherbit:
+        return _BitmapNode(bit, (_pair(
+          shift + _BITS, hashvalue, entry, otherhashvalue, other), ))
+    if bit < otherbit:
+        return _BitmapNode(bit | otherbit, (entry, other))
+    return _BitmapNode(bit | otherbit, (other, entry))
+
+
+_EMPTY = _BitmapNode(0, ())
+
+
+class HAMT(object):
+    """An immutable *mapping* based on a hash array mapped trie.
+
+    - :meth:`set` and :meth:`remove` take O(log n) time
+      and return new instances sharing all unchanged nodes.
+    - Iteration order depends on the key hashes, not on insertion order.
+    """
+    __slots__ = ['_root', '_len']
+
+    def __init__(self, items=()):
+        root = _EMPTY
+        count = 0
+        if hasattr(items, 'items'):
+            items = items.items()
+        for key, value in items:
+            root, added = root.assoc(0, _hash(key), key, value)
+            count += added
+        self._root = root
+        self._len = count
+
+    @classmethod
+    def _create(cls, root, count):
+        hamt = cls.__new__(cls)
+        hamt._root = root
+        hamt._len = count
+        return hamt
+
+    def set(self, key, value):
+        """Get a new instance with `key` set to `value`.
+        """
+        root, added = self._root.assoc(0, _hash(key), key, value)
+        if root is self._root:
+            return self
+        return self._create(root, self._len + added)
+
+    def remove(self, key):
+        """Get a new instance without `key`.
+
+        - *raises* `KeyError` if missing.
+        """
+        root = self._root.without(0, _hash(key), key)
+        if root is None:
+            root = _EMPTY
+        return self._create(root, self._len - 1)
+
+    def __getitem__(self, key):
+        # iterative variant of node.find() for the hot path
+        hashvalue = hash(key) & _HASHMASK
+        node = self._root
+        shift = 0
+        while type(node) is _BitmapNode:
+            bitmap = node.bitmap
+            bit = 1 << ((hashvalue >> shift) & _MASK)
+            if not bitmap & bit:
+                raise KeyError(key)
+            entry = node.array[_popcount(bitmap & (bit - 1))]
+            if type(entry) is tuple:
+                if entry[0] is key or entry[0] == key:
+                    return entry[1]
+                raise KeyError(key)
+            node = entry
+            shift += _BITS
+        return node.find(shift, hashvalue, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        return self.keys()
+
+    def keys(self):
+        return (key for key, _ in self._root.items())
+
+    def values(self):
+        return (value for _, value in self._root.items())
+
+    def items(self):
+        return self._root.items()
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, HAMT):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        for key, value in self.items():
+            try:
+                othervalue = other[key]
+            except KeyError:
+                return False
+            if not (othervalue is value or othervalue == value):
+                return False
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, repr(dict(self.items())))
@@ -24,16 +24,55 @@ Lazy collection implementations.
 
 .. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
 """
-__all__ = ['Lazy', 'LazyDict']
+__all__ = [
+  'Lazy', 'LazyDict', 'BoundedLazyDict', 'ThreadSafeLazyDict',
+  'AsyncLazyDict', 'LazyCycleError',
+  ]
+
+import sys
+import threading
+try:
+    from collections.abc import Set
+except ImportError: # Python 2
+    from collections import Set
+try:
+    import asyncio
+    from inspect import isawaitable
+except ImportError: # Python < 3.5
+    asyncio = None
 
 from ._common import *
+from ._cached import Flight, _move_to_end
 
 
 class Lazy(partial):
     """Just a little `partial` wrapper
        to support unique lazy value type checking in :class:`LazyDict`.
+
+    - Use :meth:`on` to create lazy values
+      depending on other values of the same :class:`LazyDict`.
     """
-    pass
+    requires = ()
+
+    @classmethod
+    def on(cls, keys, func, *args, **kwargs):
+        """Create a lazy value requiring the values of other `keys`.
+
+        - Their values get appended to the positional `args`
+          when calling `func`.
+        """
+        lazy = cls(func, *args, **kwargs)
+        lazy.requires = tuple(keys)
+        return lazy
+
+
+class LazyCycleError(ValueError):
+    """Raised for cyclic :attr:`Lazy.requires` dependencies
+       before evaluating anything.
+    """
+    def __init__(self, cycle):
+        ValueError.__init__(self, " -> ".join(map(repr, cycle)))
+        self.cycle = cycle
 
 
 class LazyDict(dict):
@@ -42,27 +81,741 @@ class LazyDict(dict):
     - Lazy values will be evaluated on first [key] access
       or use of :meth:`call()`.
     - Lazy values don't show up in :meth:`.values()` and :meth:`.items()`.
+    - The keys of pending lazy values and of resolved values
+      are tracked on every change, for cheap :meth:`pending_keys`,
+      :meth:`resolved_keys` and :meth:`resolved_items` views.
+    - Lazy values created with :meth:`Lazy.on` are evaluated
+      after all values they require, in topological order.
+      :meth:`evaluate` can evaluate independent ones in parallel.
+      :meth:`invalidate` re-arms them after a required value changed.
     """
+    CycleError = LazyCycleError
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self)
+        # keys of all Lazy values
+        self._pending = set()
+        # key --> (lazy, value) of values evaluated from Lazy.on(...)
+        self._recipes = {}
+        # key --> keys of evaluated values requiring it
+        self._dependents = {}
+        self.update(*args, **kwargs)
 
     def __getitem__(self, key):
+        if key not in self._pending:
+            return dict.__getitem__(self, key)
         value = dict.__getitem__(self, key)
+        if value.requires:
+            self.evaluate([key])
+            return dict.__getitem__(self, key)
+        value = self[key] = value()
+        return value
+
+    def __setitem__(self, key, value):
         if isinstance(value, Lazy):
-            value = self[key] = value()
+            self._arm(key, value)
+        else:
+            self._resolve(key, value)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._pending.discard(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        # unpickling sets the items again after a fresh __init__,
+        # which restores the pending/resolved key tracking
+        return type(self), (), None, None, iter(dict.items(self))
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return dict.__getitem__(self, key)
+
+    def pop(self, key, *default):
+        value = dict.pop(self, key, *default)
+        self._pending.discard(key)
         return value
 
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self._pending.discard(key)
+        return key, value
+
+    def clear(self):
+        dict.clear(self)
+        self._pending.clear()
+
     def call(self, key, *args, **kwargs):
         value = dict.__getitem__(self, key)
         if not isinstance(value, Lazy):
             raise TypeError("%s value is not a Lazy instance." % repr(key))
+        if value.requires:
+            self.evaluate(value.requires)
+            return self._evaluate_one(key, args, kwargs)
         value = self[key] = value(*args, **kwargs)
         return value
 
     def values(self):
-        for value in dict.values(self):
-            if type(value) is not Lazy:
-                yield value
+        for _, value in self.resolved_items():
+            yield value
 
     def items(self):
-        for key, value in dict.items(self):
-            if type(value) is not Lazy:
-                yield key, value
+        return iter(self.resolved_items())
+
+    def pending_keys(self):
+        """Get a live set view of the keys of pending lazy values.
+        """
+        return PendingKeys(self)
+
+    def resolved_keys(self):
+        """Get a live set view of the keys of resolved values.
+        """
+        return ResolvedKeys(self)
+
+    def resolved_items(self):
+        """Get a live set view of the (key, value) pairs of resolved values.
+        """
+        return ResolvedItems(self)
+
+    def evaluate(self, keys=None, executor=None):
+        """Evaluate the lazy values of `keys` (default: all)
+           and all values they require.
+
+        - Required values are always evaluated first.
+          Cycles are detected before anything is evaluated.
+        - With a :mod:`concurrent.futures` `executor`,
+          every value is submitted as soon as its requirements are ready,
+          so independent values are evaluated in parallel.
+        """
+        if keys is None:
+            keys = list(self._pending)
+        order = self._order(keys)
+        if executor is None:
+            for key in order:
+                self._evaluate_one(key)
+            return
+
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        waiting, dependents = self._graph(order)
+        running = {}
+
+        def submit(key):
+            lazy = dict.__getitem__(self, key)
+            future = executor.submit(lazy, *self._requirements(lazy))
+            running[future] = key
+
+        for key in order:
+            if not waiting[key]:
+                submit(key)
+        try:
+            while running:
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for future in done:
+                    key = running.pop(future)
+                    self._store(
+                      key, dict.__getitem__(self, key), future.result())
+                    for dependent in dependents.get(key, ()):
+                        waiting[dependent].discard(key)
+                        if not waiting[dependent]:
+                            submit(dependent)
+        except BaseException:
+            for future in running:
+                future.cancel()
+            raise
+
+    def invalidate(self, key):
+        """Re-arm all values evaluated from :meth:`Lazy.on`
+           which (transitively) require the value of `key`.
+
+        - Call this after changing the value of `key`.
+        - Re-armed values are only evaluated again on next access.
+        - Values changed in the meantime are left alone.
+        - Returns the list of re-armed keys.
+        """
+        rearmed = []
+        stack = list(self._dependents.pop(key, ()))
+        while stack:
+            key = stack.pop()
+            try:
+                lazy, value = self._recipes.pop(key)
+            except KeyError: # already re-armed
+                continue
+            for required in lazy.requires:
+                self._dependents.get(required, set()).discard(key)
+            current = dict.get(self, key, lazy)
+            if current is value:
+                self._arm(key, lazy)
+                rearmed.append(key)
+            elif current is not lazy: # changed in the meantime
+                continue
+            # dependents of evicted values can still be outdated
+            stack.extend(self._dependents.pop(key, ()))
+        return rearmed
+
+    def _order(self, keys):
+        """Get the pending `keys` and all pending keys they require
+           in topological order.
+
+        - *raises* :class:`LazyCycleError` for dependency cycles
+          and `KeyError` for missing requirements.
+        """
+        order = []
+        done = set()
+        path = []
+
+        def visit(key):
+            if key in done:
+                return
+            if key in path:
+                raise LazyCycleError(path[path.index(key):] + [key])
+            value = dict.__getitem__(self, key)
+            if isinstance(value, Lazy):
+                path.append(key)
+                for required in value.requires:
+                    visit(required)
+                path.pop()
+                order.append(key)
+            done.add(key)
+
+        for key in keys:
+            visit(key)
+        return order
+
+    def _graph(self, order):
+        """Get the requirements of topologically sorted pending keys
+           among each other, as dicts of *key* --> pending requirements
+           and *key* --> pending dependents.
+        """
+        pending = set(order)
+        waiting = {}
+        dependents = {}
+        for key in order:
+            requires = waiting[key] = set(
+              required for required in dict.__getitem__(self, key).requires
+              if required in pending)
+            for required in requires:
+                dependents.setdefault(required, []).append(key)
+        return waiting, dependents
+
+    def _requirements(self, lazy):
+        """Get the already evaluated values required by `lazy`.
+        """
+        return [dict.__getitem__(self, key) for key in lazy.requires]
+
+    def _evaluate_one(self, key, args=(), kwargs={}):
+        """Evaluate pending `key` whose requirements are all evaluated.
+        """
+        lazy = dict.__getitem__(self, key)
+        value = lazy(*tuple(self._requirements(lazy)) + args, **kwargs)
+        self._store(key, lazy, value)
+        return value
+
+    def _store(self, key, lazy, value):
+        """Replace `lazy` at `key` with its evaluated `value`.
+        """
+        self._resolve(key, value)
+        if lazy.requires:
+            self._recipes[key] = lazy, value
+            for required in lazy.requires:
+                self._dependents.setdefault(required, set()).add(key)
+
+    # the key sets are always changed in an order
+    # which lets lock-free readers never see a Lazy as resolved value
+
+    def _arm(self, key, lazy):
+        """Set pending `lazy` at `key`.
+        """
+        self._pending.add(key)
+        dict.__setitem__(self, key, lazy)
+
+    def _resolve(self, key, value):
+        """Set resolved `value` at `key`.
+        """
+        dict.__setitem__(self, key, value)
+        self._pending.discard(key)
+
+
+class LazyDictView(Set):
+    """Base for live set views of :class:`LazyDict` entries.
+    """
+    __slots__ = ('_lazydict', )
+
+    def __init__(self, lazydict):
+        self._lazydict = lazydict
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, repr(list(self)))
+
+
+class PendingKeys(LazyDictView):
+    """Live set view of the keys of pending :class:`LazyDict` values.
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        return len(self._lazydict._pending)
+
+    def __contains__(self, key):
+        return key in self._lazydict._pending
+
+    def __iter__(self):
+        # copy for safe iteration while values get resolved
+        return iter(list(self._lazydict._pending))
+
+
+class ResolvedKeys(LazyDictView):
+    """Live set view of the keys of resolved :class:`LazyDict` values.
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        lazydict = self._lazydict
+        return dict.__len__(lazydict) - len(lazydict._pending)
+
+    def __contains__(self, key):
+        lazydict = self._lazydict
+        return key not in lazydict._pending \
+          and dict.__contains__(lazydict, key)
+
+    def __iter__(self):
+        lazydict = self._lazydict
+        pending = lazydict._pending
+        if not pending:
+            return iter(dict.keys(lazydict))
+        return (key for key in dict.keys(lazydict) if key not in pending)
+
+
+class ResolvedItems(LazyDictView):
+    """Live set view of the (key, value) pairs
+       of resolved :class:`LazyDict` values.
+    """
+    __slots__ = ()
+
+    def __len__(self):
+        lazydict = self._lazydict
+        return dict.__len__(lazydict) - len(lazydict._pending)
+
+    def __contains__(self, item):
+        key, value = item
+        lazydict = self._lazydict
+        if key in lazydict._pending or not dict.__contains__(lazydict, key):
+            return False
+        return dict.__getitem__(lazydict, key) == value
+
+    def __iter__(self):
+        lazydict = self._lazydict
+        pending = lazydict._pending
+        if not pending:
+            return iter(dict.items(lazydict))
+        return ((key, value) for key, value in dict.items(lazydict)
+                if key not in pending)
+
+
+class BoundedLazyDict(LazyDict):
+    """A :class:`LazyDict` keeping the :class:`Lazy` recipes
+       of evaluated values to drop them again under memory pressure.
+
+    - Set ``maxsize`` (number of evaluated values)
+      and/or ``maxbytes`` (their total ``sizeof()``)
+      in a derived class to limit the evaluated values kept.
+    - The least recently accessed values are dropped first
+      and transparently evaluated again on next access.
+      Dropped values don't show up in :meth:`.values()` and :meth:`.items()`
+      until then.
+    - Only values evaluated on [key] access can be dropped.
+      Explicitly assigned values and :meth:`call` results are always kept.
+    - ``sizeof`` defaults to ``sys.getsizeof``,
+      which is shallow for most containers.
+      Override it for values with nested data.
+    """
+    maxsize = None
+    maxbytes = None
+    sizeof = staticmethod(sys.getsizeof)
+
+    def __init__(self, *args, **kwargs):
+        # key --> (lazy, nbytes) of droppable values in access order
+        self._droppable = OrderedDict()
+        self.nbytes = 0
+        self.evictions = 0
+        LazyDict.__init__(self, *args, **kwargs)
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            if dict.__getitem__(self, key).requires:
+                self._order([key]) # check for cycles up front
+            return self._evaluate_one(key)
+        value = dict.__getitem__(self, key)
+        if key in self._droppable:
+            _move_to_end(self._droppable, key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._forget(key)
+        LazyDict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._forget(key)
+        LazyDict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        self._forget(key)
+        return LazyDict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = LazyDict.popitem(self)
+        self._forget(key)
+        return key, value
+
+    def clear(self):
+        LazyDict.clear(self)
+        self._droppable.clear()
+        self.nbytes = 0
+
+    def call(self, key, *args, **kwargs):
+        value = self[key] = LazyDict.call(self, key, *args, **kwargs)
+        return value
+
+    def _requirements(self, lazy):
+        # required values could have been dropped
+        return [self[key] for key in lazy.requires]
+
+    def _store(self, key, lazy, value):
+        LazyDict._store(self, key, lazy, value)
+        nbytes = self.sizeof(value) if self.maxbytes is not None else 0
+        self._droppable[key] = lazy, nbytes
+        self.nbytes += nbytes
+        maxsize = self.maxsize
+        maxbytes = self.maxbytes
+        while self._droppable and (
+          (maxsize is not None and len(self._droppable) > maxsize) or
+          (maxbytes is not None and self.nbytes > maxbytes)):
+            key, (lazy, nbytes) = self._droppable.popitem(last=False)
+            self._arm(key, lazy)
+            self.nbytes -= nbytes
+            self.evictions += 1
+
+    def _forget(self, key):
+        """Stop tracking the value of `key` as droppable.
+        """
+        try:
+            _, nbytes = self._droppable.pop(key)
+        except KeyError:
+            return
+        self.nbytes -= nbytes
+
+
+class ThreadSafeLazyDict(LazyDict):
+    """A :class:`LazyDict` evaluating every lazy value exactly once,
+       also with concurrent access from several threads.
+
+    - Threads accessing a value under evaluation
+      block until the evaluating thread is done.
+    - Already evaluated values are accessed without locking.
+    - If evaluation fails, the exception is raised in all waiting threads.
+      The next access retries evaluation by default.
+      With ``cache_failures = True`` in a derived class,
+      the exception is raised again on all later accesses instead,
+      until the key gets a new value.
+    - :meth:`call` arguments only apply to the one call
+      that actually evaluates the value.
+    - :meth:`prefetch` evaluates many values concurrently
+      on a thread or process pool.
+    """
+    cache_failures = False
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._failures = {}
+        LazyDict.__init__(self, *args, **kwargs)
+
+    def __getitem__(self, key):
+        if key not in self._pending:
+            return dict.__getitem__(self, key)
+        return self._evaluate(key, (), {})
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._failures.pop(key, None)
+            LazyDict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        with self._lock:
+            self._failures.pop(key, None)
+            LazyDict.__delitem__(self, key)
+
+    def call(self, key, *args, **kwargs):
+        if not isinstance(dict.__getitem__(self, key), Lazy):
+            raise TypeError("%s value is not a Lazy instance." % repr(key))
+        return self._evaluate(key, args, kwargs)
+
+    def evaluate(self, keys=None, executor=None):
+        """Like :meth:`LazyDict.evaluate`,
+           but thread-safe and waiting for values under evaluation.
+        """
+        if executor is None:
+            if keys is None:
+                keys = list(self._pending)
+            for key in self._order(keys):
+                self[key]
+            return
+
+        futures = self.prefetch(keys, executor)
+        for key in futures:
+            futures[key].result()
+
+    def invalidate(self, key):
+        with self._lock:
+            return LazyDict.invalidate(self, key)
+
+    def prefetch(self, keys=None, executor=None):
+        """Evaluate the pending lazy values of `keys` (default: all)
+           and all values they require
+           concurrently on a :mod:`concurrent.futures` `executor`.
+
+        - Without `executor`, a temporary thread pool is used.
+        - Values of a process pool executor must be picklable,
+          so their :class:`Lazy` functions must be defined at module level.
+        - Every value is submitted as soon as its requirements are ready.
+        - Accessing any of those keys meanwhile waits for the prefetch.
+        - Returns a `dict` of *key* --> *future* for all prefetched keys,
+          which can be passed to ``concurrent.futures.as_completed()``.
+          Keys which are already evaluated or under evaluation are skipped.
+        """
+        if keys is None:
+            keys = list(self._pending)
+        batch = []
+        with self._lock:
+            for key in self._order(keys):
+                if key not in self._flights and key not in self._failures:
+                    self._flights[key] = Flight()
+                    batch.append(key)
+        if not batch:
+            return {}
+
+        from concurrent.futures import Future, ThreadPoolExecutor
+
+        shutdown = executor is None
+        if shutdown:
+            executor = ThreadPoolExecutor(max_workers=min(32, len(batch)))
+        waiting, dependents = self._graph(batch)
+        futures = dict((key, Future()) for key in batch)
+        claimed = set(batch)
+
+        def submit(key):
+            try:
+                lazy = dict.__getitem__(self, key)
+                # requirements outside the batch could still be in flight
+                requirements = [self[required] for required in lazy.requires]
+                future = executor.submit(lazy, *requirements)
+            except BaseException:
+                landed(key, exc_info=sys.exc_info())
+            else:
+                future.add_done_callback(partial(landed, key))
+
+        def landed(key, future=None, exc_info=None):
+            if future is not None:
+                try:
+                    value = future.result()
+                except BaseException: # also if cancelled
+                    exc_info = sys.exc_info()
+            with self._lock:
+                if key not in claimed: # already failed with a requirement
+                    return
+                claimed.remove(key)
+                flight = self._flights.pop(key)
+                if exc_info is None:
+                    self._store(key, dict.__getitem__(self, key), value)
+                elif self.cache_failures and not (
+                  future is not None and future.cancelled()):
+                    self._failures[key] = exc_info
+                if shutdown and not claimed:
+                    executor.shutdown(wait=False)
+            if exc_info is None:
+                flight.finish(value)
+                futures[key].set_result(value)
+            else:
+                flight.fail(exc_info)
+                futures[key].set_exception(exc_info[1])
+            for dependent in dependents.get(key, ()):
+                if exc_info is not None: # fails as well
+                    landed(dependent, exc_info=exc_info)
+                    continue
+                waiting[dependent].discard(key)
+                if not waiting[dependent] and dependent in claimed:
+                    submit(dependent)
+
+        for key in batch:
+            if not waiting[key]:
+                submit(key)
+        return futures
+
+    def _evaluate(self, key, args, kwargs):
+        with self._lock:
+            # could have been evaluated in the meantime
+            value = dict.__getitem__(self, key)
+            if not isinstance(value, Lazy):
+                return value
+
+            failure = self._failures.get(key)
+            if failure is not None:
+                reraise(*failure)
+            flight = self._flights.get(key)
+            owner = flight is None
+            if owner:
+                if value.requires:
+                    self._order([key]) # check for cycles up front
+                flight = self._flights[key] = Flight()
+        if not owner:
+            return flight.wait()
+
+        try:
+            requirements = tuple(self[required] for required in value.requires)
+            result = value(*requirements + args, **kwargs)
+        except BaseException:
+            exc_info = sys.exc_info()
+            with self._lock:
+                del self._flights[key]
+                if self.cache_failures:
+                    self._failures[key] = exc_info
+            flight.fail(exc_info)
+            raise
+        with self._lock:
+            del self._flights[key]
+            self._store(key, value, result)
+        flight.finish(result)
+        return result
+
+
+class AsyncLazyDict(LazyDict):
+    """A :class:`LazyDict` for lazy values from coroutine functions,
+       to be resolved with ``await d.get(key)`` or ``await d.gather(...)``.
+
+    - Each lazy value is evaluated only once.
+      Concurrent awaiters of a value under evaluation share its future,
+      but cancelling one of them doesn't cancel the evaluation.
+    - :class:`Lazy` functions returning no awaitable
+      are also supported and resolve immediately.
+    - Values required by :meth:`Lazy.on` values
+      are resolved concurrently before.
+    - If evaluation fails, the next access retries it.
+    - ``d[key]`` only works for already resolved values
+      and raises `TypeError` for pending ones.
+    """
+    def __init__(self, *args, **kwargs):
+        LazyDict.__init__(self, *args, **kwargs)
+        self._futures = {}
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, Lazy):
+            raise TypeError(
+              "%s value is pending. Use await .get() instead." % repr(key))
+        return value
+
+    def call(self, key, *args, **kwargs):
+        raise TypeError(
+          "%s doesn't support .call()" % type(self).__name__)
+
+    def evaluate(self, keys=None, executor=None):
+        raise TypeError(
+          "%s doesn't support .evaluate(). Use await .gather() instead."
+          % type(self).__name__)
+
+    def get(self, key, default=None):
+        """Get an awaitable for the value of `key` or `default`.
+        """
+        loop = asyncio.get_event_loop()
+        if not dict.__contains__(self, key):
+            return self._done(default, loop)
+        return self._future(key, loop)
+
+    def gather(self, *keys):
+        """Get an awaitable for a list of the values of all `keys`.
+
+        - Already resolved values don't need any extra task,
+          so everything is resolved in one event loop round trip
+          if no value is pending.
+        """
+        loop = asyncio.get_event_loop()
+        return asyncio.gather(*(self._future(key, loop) for key in keys))
+
+    @staticmethod
+    def _done(value, loop):
+        future = loop.create_future()
+        future.set_result(value)
+        return future
+
+    def _future(self, key, loop):
+        value = dict.__getitem__(self, key)
+        if not isinstance(value, Lazy):
+            return self._done(value, loop)
+
+        future = self._futures.get(key)
+        if future is None:
+            if value.requires:
+                self._order([key]) # check for cycles up front
+                future = loop.create_future()
+                requirements = asyncio.gather(*(
+                  self._future(required, loop)
+                  for required in value.requires))
+                requirements.add_done_callback(
+                  partial(self._required, value, future))
+            else:
+                result = value()
+                if not isawaitable(result):
+                    self._resolve(key, result)
+                    return self._done(result, loop)
+
+                future = asyncio.ensure_future(result)
+            self._futures[key] = future
+            future.add_done_callback(partial(self._evaluated, key, value))
+        return asyncio.shield(future)
+
+    @staticmethod
+    def _required(lazy, future, requirements):
+        """Start evaluating `lazy` into `future`
+           when its `requirements` are resolved.
+        """
+        if requirements.cancelled():
+            future.cancel()
+            return
+
+        exc = requirements.exception()
+        if exc is not None:
+            future.set_exception(exc)
+            return
+
+        try:
+            result = lazy(*requirements.result())
+        except Exception as exc:
+            future.set_exception(exc)
+            return
+
+        if not isawaitable(result):
+            future.set_result(result)
+            return
+
+        def resolved(task):
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+
+        asyncio.ensure_future(result).add_done_callback(resolved)
+
+    def _evaluated(self, key, lazy, future):
+        del self._futures[key]
+        if not future.cancelled() and future.exception() is None:
+            self._store(key, lazy, future.result())
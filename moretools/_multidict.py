@@ -35,12 +35,59 @@ class _NoValue:
     pass
 
 
+class KeyUnion(object):
+    """Union of the keys of multiple dicts,
+       maintained with per-key reference counts.
+
+    - Supports O(1) `len()` and membership checks,
+      and iteration without building a new set from all dicts.
+    """
+    def __init__(self, dicts):
+        #: the list of dicts whose keys are counted
+        self.dicts = dicts
+        # key --> number of dicts containing it
+        self.counts = {}
+
+    def add(self, key):
+        counts = self.counts
+        counts[key] = counts.get(key, 0) + 1
+
+    def discard(self, key):
+        counts = self.counts
+        count = counts.get(key, 0)
+        if count > 1:
+            counts[key] = count - 1
+        elif count:
+            del counts[key]
+
+    def update(self, keys):
+        for key in keys:
+            self.add(key)
+
+    def difference_update(self, keys):
+        for key in keys:
+            self.discard(key)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, key):
+        return key in self.counts
+
+    def __iter__(self):
+        # iterate a snapshot to allow changes in the meantime
+        return iter(list(self.counts))
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, repr(self.counts))
+
+
 class _MultiDictBase(object):
     def __init__(self, dicts):
         self.__dicts__ = list(dicts)
 
     def __len__(self):
-        return len(set(chain(*(d.keys() for d in self.__dicts__))))
+        return len(set().union(*(d.keys() for d in self.__dicts__)))
 
     def __getitem__(self, key):
         raise NotImplementedError
@@ -51,7 +98,7 @@ class _MultiDictBase(object):
 
 class MultiDictType(_MultiDictBase):
     def keys(self):
-        for key in set(chain(*(d.keys() for d in self.__dicts__))):
+        for key in set().union(*(d.keys() for d in self.__dicts__)):
             yield key
 
     def values(self):
@@ -66,7 +113,10 @@ class MultiDictType(_MultiDictBase):
         return self.keys()
 
     def __contains__(self, key):
-        return key in self.keys()
+        try:
+            return any(key in d for d in self.__dicts__)
+        except TypeError: # unhashable
+            return False
 
 
 class _DictSetMeta(type):
@@ -139,6 +189,13 @@ class DictStruct(MultiDictType, dict):
           )):
             yield key
 
+    def __contains__(self, key):
+        try:
+            return dict.__contains__(self, key) \
+              or any(key in d for d in self.__bases__)
+        except TypeError: # unhashable
+            return False
+
     def __repr__(self):
         return '%s(%s, %s, %s)' % (
           type(self).__name__, repr(self.__name__), repr(self.__bases__),
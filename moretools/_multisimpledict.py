@@ -24,24 +24,71 @@ Various container types with a combined interface to multiple `simpledict`s.
 
 .. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
 """
-from six import with_metaclass
+from six import with_metaclass, integer_types
 
 __all__ = [
   'MultiSimpleDictType',
   'SimpleDictSetType', 'simpledictset',
-  'SimpleDictZipType', 'simpledictzip',
+  'SimpleDictZipType', 'SimpleDictColumnarZipType', 'simpledictzip',
   ]
 
+try:
+    import numpy
+except ImportError: # optional
+    numpy = None
+
 from ._common import *
 
 from ._multidict import *
-from ._multidict import _NoValue, _MultiDictBase
+from ._multidict import _NoValue, _MultiDictBase, KeyUnion
+from ._simpledict import (
+  SimpleDictType, SimpleDictStructType,
+  _simpledictitems, _simpledictget, _watchkeys,
+  _flattened, _flatten, _resolution_order, _cacheflat)
+
+
+class SimpleDictKeyUnion(KeyUnion):
+    """:class:`KeyUnion` of distinct simpledicts,
+       incrementally updated by the simpledicts' mutators.
+    """
+    def __init__(self, dicts):
+        KeyUnion.__init__(self, dicts)
+        for d in dicts:
+            self.update(key for key, _ in _simpledictitems(d))
+            _watchkeys(d, self)
+
+    def checkkey(self, d, key):
+        pass
+
+    def addkey(self, d, key):
+        self.add(key)
+
+    def removekey(self, d, key):
+        self.discard(key)
+
+    def resetkeys(self, d, keys):
+        self.difference_update([key for key, _ in _simpledictitems(d)])
+        self.update(keys)
+
+
+def _keyunion(multisimpledict):
+    """Get the maintained :class:`SimpleDictKeyUnion` of `multisimpledict`,
+       or ``None`` if its member keys can't be tracked
+       or its `__dicts__` was replaced.
+    """
+    keys = multisimpledict.__keys__
+    if keys is None or keys.dicts is not multisimpledict.__dicts__:
+        return None
+    return keys
 
 
 class MultiSimpleDictMeta(type):
     def keys(cls, self):
-        return iter(set(chain(*(
-          d.__dict__.keys() for d in self.__dicts__))))
+        keys = _keyunion(self)
+        if keys is not None:
+            return iter(keys)
+        return iter(set(
+          key for d in self.__dicts__ for key, _ in _simpledictitems(d)))
 
     def items(cls, self):
         for key in type(cls).keys(cls, self):
@@ -51,8 +98,49 @@ class MultiSimpleDictMeta(type):
         for key in type(cls).keys(cls, self):
             yield self[key]
 
+    def haskey(cls, self, key):
+        keys = _keyunion(self)
+        try:
+            if keys is not None:
+                return key in keys
+            return any(
+              _simpledictget(d, key, _NoValue) is not _NoValue
+              for d in self.__dicts__)
+        except TypeError: # unhashable
+            return False
+
+
+class MultiSimpleDictType(
+  with_metaclass(MultiSimpleDictMeta, _MultiDictBase)
+  ):
+    """Base for combined interfaces to multiple simpledicts.
+
+    - The members are stored as a `__dicts__` tuple.
+    - The union of all member keys is maintained in a
+      :class:`SimpleDictKeyUnion` with per-key reference counts,
+      unless any member is no simpledict or is given more than once,
+      or `__dicts__` gets replaced after instantiation.
+    """
+    #: maintained :class:`SimpleDictKeyUnion` of all member keys,
+    #  if changes of the members can be tracked
+    __keys__ = None
+
+    def __init__(self, dicts):
+        dicts = tuple(dicts)
+        keys = None
+        if len(set(map(id, dicts))) == len(dicts) and all(
+          isinstance(d, SimpleDictType) for d in dicts):
+            keys = SimpleDictKeyUnion(dicts)
+        self.__keys__ = keys
+        self.__dicts__ = dicts
+
+    def __len__(self):
+        keys = _keyunion(self)
+        if keys is not None:
+            return len(keys)
+        cls = type(self) # holds the helper methods and custom options
+        return len(set(type(cls).keys(cls, self)))
 
-class MultiSimpleDictType(_MultiDictBase):
     def __iter__(self):
         cls = type(self) # holds the helper methods and custom options
         # Get the custom specified iterate functions from metaclass
@@ -67,10 +155,41 @@ class MultiSimpleDictType(_MultiDictBase):
         return list(set(chain(*(dir(d) for d in self.__dicts__))))
 
     def __contains__(self, item):
+        cls = type(self) # holds the helper methods and custom options
+        iterate = cls.iterate
+        haskey = type(cls).haskey
+        if iterate == 'keys':
+            return haskey(cls, self, item)
+        if iterate == 'items':
+            if not isinstance(item, tuple) or len(item) != 2:
+                return False
+            key, value = item
+            if not haskey(cls, self, key):
+                return False
+            try:
+                stored = self[key]
+            except LookupError: # missing in some or in multiple members
+                return False
+            return stored is value or stored == value
         return item in iter(self)
 
 
 class SimpleDictSetMeta(MultiSimpleDictMeta):
+    unique = False
+
+    def owners(cls, self, table, name):
+        """Get the members of simpledictset `self` owning `name`
+           in the given :class:`SimpleDictOwners` index `table`
+           ('keys' or 'attrs'), or ``None`` if not indexed.
+        """
+        owners = self.__owners__
+        if owners is None or owners.dicts is not self.__dicts__:
+            return None
+        try:
+            return getattr(owners, table).get(name, ())
+        except TypeError: # unhashable
+            return ()
+
     class MultipleKeyError(LookupError):
         pass
 
@@ -86,11 +205,114 @@ class SimpleDictSetMeta(MultiSimpleDictMeta):
     MultipleAttribute = MultipleAttributeError
 
 
+class SimpleDictOwners(object):
+    """Index of the member simpledicts of a :class:`SimpleDictSetType`
+       instance owning each key and attribute name.
+
+    - Gets incrementally updated by the members' mutators.
+    - With `unique` option, adding a key or attribute name
+      already owned by another member raises
+      `simpledictset.MultipleKeyError` or
+      `simpledictset.MultipleAttributeError` before the value is stored.
+    """
+    def __init__(self, dictsettype, dicts, unique=False):
+        self.dictsettype = dictsettype
+        self.unique = unique
+        # key --> owners
+        self.keys = {}
+        # attrname --> owners
+        self.attrs = {}
+        for d in dicts:
+            for key, _ in _simpledictitems(d):
+                self.checkkey(d, key)
+                self.addkey(d, key)
+        self.dicts = dicts
+        for d in dicts:
+            _watchkeys(d, self)
+
+    def checkkey(self, d, key):
+        if not self.unique:
+            return
+        owners = self.keys.get(key, ())
+        if any(owner is not d for owner in owners):
+            raise self.dictsettype.MultipleKeyError(key)
+        attrname = type(d)._validated_attr(key)
+        owners = self.attrs.get(attrname, ())
+        if any(owner is not d for owner in owners):
+            raise self.dictsettype.MultipleAttributeError(attrname)
+
+    def addkey(self, d, key):
+        for table, name in [
+          (self.keys, key), (self.attrs, type(d)._validated_attr(key)),
+          ]:
+            owners = table.setdefault(name, [])
+            if not any(owner is d for owner in owners):
+                owners.append(d)
+
+    def removekey(self, d, key):
+        for table, name in [
+          (self.keys, key), (self.attrs, type(d)._validated_attr(key)),
+          ]:
+            owners = table.get(name)
+            if owners is None:
+                continue
+            owners[:] = [owner for owner in owners if owner is not d]
+            if not owners:
+                del table[name]
+
+    def resetkeys(self, d, keys):
+        # check everything before changing anything
+        for key in keys:
+            self.checkkey(d, key)
+        # `d` still has its old storage
+        for key, _ in _simpledictitems(d):
+            self.removekey(d, key)
+        for key in keys:
+            self.addkey(d, key)
+
+
 class SimpleDictSetType(
   with_metaclass(SimpleDictSetMeta, MultiSimpleDictType)
   ):
+    """Combined interface to a set of simpledicts with distinct keys.
+
+    - Keys and attribute names are looked up through an index
+      of their owning members (see :class:`SimpleDictOwners`),
+      unless any member is no basic simpledict
+      or `__dicts__` gets replaced after instantiation.
+    """
+    def __init__(self, dicts):
+        cls = type(self) # holds the helper methods and custom options
+        MultiSimpleDictType.__init__(self, dicts)
+        dicts = self.__dicts__
+        owners = None
+        if self.__keys__ is not None and not any(
+          isinstance(d, SimpleDictStructType) for d in dicts):
+            # *raises* `MultipleKeyError` with `unique` option
+            owners = SimpleDictOwners(cls, dicts, unique=cls.unique)
+        elif cls.unique:
+            if len(set(map(id, dicts))) != len(dicts):
+                raise ValueError(
+                  "%s with `unique` option can't contain a simpledict twice."
+                  % cls.__name__)
+            raise TypeError(
+              "%s with `unique` option only supports basic simpledicts, "
+              "not structs or other objects." % cls.__name__)
+        self.__owners__ = owners
+
     def __getitem__(self, key):
         cls = type(self) # holds the helper methods and custom options
+        owners = cls.owners(self, 'keys', key)
+        if owners is not None:
+            if not owners:
+                raise KeyError(key)
+            if len(owners) == 1:
+                return owners[0][key]
+            if cls.multiple_key_handler:
+                return cls.multiple_key_handler(
+                  key, [d[key] for d in owners])
+            raise cls.MultipleKey(key)
+
         ## ivalues = (d.__dict__.get(key, _NoValue) for d in self.__dicts__)
 
         def values():
@@ -112,7 +334,11 @@ class SimpleDictSetType(
 
     def __setitem__(self, key, value):
         cls = type(self)
-        dicts = [d for d in self.__dicts__ if key in d.__dict__]
+        dicts = cls.owners(self, 'keys', key)
+        if dicts is None:
+            dicts = [
+              d for d in self.__dicts__
+              if _simpledictget(d, key, _NoValue) is not _NoValue]
         if not dicts:
             raise KeyError(key)
         if len(dicts) > 1:
@@ -121,6 +347,20 @@ class SimpleDictSetType(
 
     def __getattr__(self, name):
         cls = type(self) # holds the helper methods and custom options
+        if name.startswith('__'): # is real (internal) attribute?
+            owners = None
+        else:
+            owners = cls.owners(self, 'attrs', name)
+        if owners is not None:
+            if not owners:
+                raise AttributeError(name)
+            if len(owners) == 1:
+                return getattr(owners[0], name)
+            if cls.multiple_attr_handler:
+                return cls.multiple_attr_handler(
+                  name, [getattr(d, name) for d in owners])
+            raise cls.MultipleAttribute(name)
+
         ivalues = (getattr(d, name, _NoValue) for d in self.__dicts__)
         values = [v for v in ivalues if v is not _NoValue]
         if not values:
@@ -137,7 +377,9 @@ class SimpleDictSetType(
         if name.startswith('__'):
             object.__setattr__(self, name, value)
             return
-        dicts = [d for d in self.__dicts__ if name in dir(d)]
+        dicts = cls.owners(self, 'attrs', name)
+        if dicts is None:
+            dicts = [d for d in self.__dicts__ if name in dir(d)]
         if not dicts:
             raise AttributeError(name)
         if len(dicts) > 1:
@@ -153,10 +395,18 @@ class SimpleDictSetType(
 
 def simpledictset(
   typename, iterate='items',
-  multiple_key_handler=None, multiple_attr_handler=None,
+  multiple_key_handler=None, multiple_attr_handler=None, unique=False,
   basetype=SimpleDictSetType,
   extra = {},
   ):
+    """Create a :class:`SimpleDictSetType`-derived type.
+
+    - With `unique` option, keys or attribute names shared by members
+      are rejected on instantiation and on insertion into a member
+      with `simpledictset.MultipleKeyError`
+      or `simpledictset.MultipleAttributeError`.
+      It requires distinct basic simpledicts (no structs) as members.
+    """
     if not issubclass(basetype, SimpleDictSetType):
         raise TypeError(
           "Custom `basetype` must be derived from %s." % repr(
@@ -166,6 +416,7 @@ def simpledictset(
       iterate = iterate,
       multiple_key_handler = staticmethod(multiple_key_handler),
       multiple_attr_handler = staticmethod(multiple_attr_handler),
+      unique = unique,
       )
     metaclass = type(typename + 'Meta', (type(basetype),), metaclassattrs)
     return metaclass(typename, (basetype,), {})
@@ -179,7 +430,7 @@ class SimpleDictZipType(MultiSimpleDictType):
     def __getitem__(self, key):
         cls = type(self) # holds the helper methods and custom options
         valuetuple = tuple(
-          d.__dict__.get(key, cls.default_value) for d in self.__dicts__)
+          _simpledictget(d, key, cls.default_value) for d in self.__dicts__)
         if _NoValue in valuetuple:
             raise KeyError(key)
         return valuetuple
@@ -193,10 +444,285 @@ class SimpleDictZipType(MultiSimpleDictType):
         return valuetuple
 
 
+# value types stored in typed numpy arrays by columnar simpledictzips
+_NUMBER_TYPES = (bool, float, complex) + tuple(integer_types)
+# types of boolean selection flags
+_BOOL_TYPES = (bool, ) if numpy is None else (bool, numpy.bool_)
+
+
+def _column(values):
+    """Create an immutable column of aligned `values`.
+
+    - A read-only numpy array if numpy is installed,
+      with a numeric dtype if all values are numbers of the same type,
+      or a tuple otherwise.
+    """
+    if numpy is None:
+        return tuple(values)
+
+    column = None
+    if values:
+        valuetype = type(values[0])
+        if valuetype in _NUMBER_TYPES and all(
+          type(value) is valuetype for value in values):
+            try:
+                column = numpy.array(values)
+            except (OverflowError, ValueError): # out of numpy's range
+                column = None
+            else:
+                if column.dtype == object:
+                    column = None
+    if column is None:
+        # fill item by item to prevent broadcasting of sequence values
+        column = numpy.empty(len(values), dtype=object)
+        for index, value in enumerate(values):
+            column[index] = value
+    column.flags.writeable = False
+    return column
+
+
+def _differs(column):
+    """Check if not all values in `column` are equal.
+    """
+    if not len(column):
+        return False
+    if numpy is not None and column.dtype != object:
+        return bool((column != column[0]).any())
+    first = column[0]
+    return any(not (value is first or value == first) for value in column)
+
+
+def _memberitems(d):
+    """Get all items of zipped simpledict `d`, including inherited ones.
+    """
+    if isinstance(d, SimpleDictStructType):
+        flat = _flatten(d)
+        if flat is not None:
+            return flat.items()
+    if isinstance(d, SimpleDictType):
+        return _simpledictitems(d)
+    return d.__dict__.items()
+
+
+class SimpleDictColumns(object):
+    """Aligned values of all keys of zipped simpledicts,
+       stored in one column per key.
+
+    - Columns of keys missing in any zipped simpledict
+      without a `default_value` contain `_NoValue` placeholders
+      and are listed in `.incomplete`.
+    """
+    def __init__(self, dicts, columns, incomplete, attrkeys):
+        self.dicts = dicts
+        # key --> column
+        self.columns = columns
+        # keys whose columns have gaps
+        self.incomplete = incomplete
+        # attrname --> key
+        self.attrkeys = attrkeys
+
+    @classmethod
+    def build(cls, dicts, default_value=_NoValue):
+        """Collect the columns of all keys of `dicts`.
+        """
+        rows = [dict(_memberitems(d)) for d in dicts]
+        columns = OrderedDict()
+        incomplete = set()
+        for row in rows:
+            for key in row:
+                if key in columns:
+                    continue
+                values = [r.get(key, default_value) for r in rows]
+                if any(value is _NoValue for value in values):
+                    incomplete.add(key)
+                columns[key] = _column(values)
+        return cls(dicts, columns, incomplete, cls._attrkeys(dicts, columns))
+
+    @staticmethod
+    def _attrkeys(dicts, keys):
+        attrkeys = {}
+        for dicttype in set(map(type, dicts)):
+            if not isinstance(dicttype, type(SimpleDictType)):
+                continue
+            for key in keys:
+                try:
+                    attrkeys[dicttype._validated_attr(key)] = key
+                except (AttributeError, LookupError): # invalid for this type
+                    pass
+        return attrkeys
+
+    def select(self, dicts, where):
+        """Get the columns of the zipped simpledicts selected by `where`,
+           which already got applied to `dicts`.
+        """
+        columns = OrderedDict()
+        for key, column in self.columns.items():
+            if isinstance(where, slice): # a view for numpy arrays
+                column = column[where]
+            elif isinstance(column, tuple):
+                column = tuple(column[index] for index in where)
+            else: # a copy by numpy's advanced indexing
+                column = column[where]
+                column.flags.writeable = False
+            columns[key] = column
+        incomplete = set(
+          key for key in self.incomplete
+          if any(value is _NoValue for value in columns[key]))
+        return type(self)(dicts, columns, incomplete, self.attrkeys)
+
+
+def _zipmembers(dicts):
+    """Get all simpledicts whose changes affect the columns of `dicts`,
+       or ``None`` if any of them can't be tracked.
+    """
+    members = []
+    for d in dicts:
+        order = _resolution_order(d)
+        if order is None:
+            return None
+        members.extend(order)
+    return members
+
+
+class SimpleDictColumnarZipMeta(MultiSimpleDictMeta):
+    def columns(cls, self, build=None):
+        """Get the :class:`SimpleDictColumns` of simpledictzip `self`.
+
+        - Cached until any zipped simpledict changes.
+        """
+        try:
+            columns = _flattened[id(self)][0]
+        except KeyError:
+            pass
+        else:
+            if columns.dicts is self.__dicts__:
+                return columns
+
+        dicts = self.__dicts__
+        if build is None:
+            build = partial(SimpleDictColumns.build, dicts, cls.default_value)
+        members = _zipmembers(dicts)
+        if members is None: # can't cache
+            return build()
+
+        return _cacheflat(self, members, build)
+
+    def keys(cls, self):
+        columns = cls.columns(self)
+        incomplete = columns.incomplete
+        return (key for key in columns.columns if key not in incomplete)
+
+    def haskey(cls, self, key):
+        columns = cls.columns(self)
+        try:
+            return key in columns.columns and key not in columns.incomplete
+        except TypeError: # unhashable
+            return False
+
+    def diff(cls, self):
+        """Get a mapping of all keys of simpledictzip `self`
+           to their value columns, whose values differ
+           between the zipped simpledicts.
+        """
+        columns = cls.columns(self)
+        incomplete = columns.incomplete
+        return OrderedDict(
+          (key, column) for key, column in columns.columns.items()
+          if key not in incomplete and _differs(column))
+
+    def select(cls, self, where):
+        """Create a new simpledictzip of the same type
+           from the zipped simpledicts of `self` selected by `where`,
+           which can be a slice, a sequence of indices,
+           or a sequence of booleans with one per zipped simpledict.
+
+        - The columns of `self` are reused.
+          They are shared as numpy array views when selecting by a slice.
+        """
+        dicts = self.__dicts__
+        if isinstance(where, slice):
+            selected = dicts[where]
+        else:
+            where = list(where)
+            if len(where) == len(dicts) and all(
+              isinstance(flag, _BOOL_TYPES) for flag in where):
+                where = [index for index, flag in enumerate(where) if flag]
+            selected = [dicts[index] for index in where]
+        columns = cls.columns(self)
+        new = cls(selected)
+        cls.columns(new, build=partial(columns.select, new.__dicts__, where))
+        return new
+
+
+class SimpleDictColumnarZipType(
+  with_metaclass(SimpleDictColumnarZipMeta, SimpleDictZipType)
+  ):
+    """Like :class:`SimpleDictZipType`,
+       but with the aligned values of each key stored together in columns.
+
+    - Values are returned as immutable columns without copying:
+      read-only numpy arrays if numpy is installed, or tuples otherwise.
+    - Columns are built once and cached until any zipped simpledict changes,
+      as long as `__dicts__` doesn't get replaced.
+    - Provides bulk `.diff()` and `.select()` operations
+      over all keys as class-level helper methods.
+    """
+    def __getitem__(self, key):
+        cls = type(self) # holds the helper methods and custom options
+        columns = cls.columns(self)
+        if key in columns.incomplete:
+            raise KeyError(key)
+        return columns.columns[key]
+
+    def __getattr__(self, name):
+        cls = type(self) # holds the helper methods and custom options
+        if name.startswith('__'): # is real (internal) attribute?
+            raise AttributeError(name)
+        columns = cls.columns(self)
+        try:
+            return self[columns.attrkeys[name]]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __len__(self):
+        cls = type(self) # holds the helper methods and custom options
+        columns = cls.columns(self)
+        return len(columns.columns) - len(columns.incomplete)
+
+    def __contains__(self, item):
+        cls = type(self) # holds the helper methods and custom options
+        if cls.iterate != 'items':
+            return MultiSimpleDictType.__contains__(self, item)
+        if not isinstance(item, tuple) or len(item) != 2:
+            return False
+        key, value = item
+        if not cls.haskey(self, key):
+            return False
+        stored = self[key]
+        try:
+            if len(value) != len(stored):
+                return False
+        except TypeError: # no sequence
+            return False
+        return all(s is v or s == v for s, v in zip(stored, value))
+
+
 def simpledictzip(
-  typename, iterate='items', default_value=_NoValue,
-  basetype=SimpleDictZipType
+  typename, iterate='items', default_value=_NoValue, columnar=False,
+  basetype=None
   ):
+    """Create a :class:`SimpleDictZipType`-derived type.
+
+    - With `columnar` option, a :class:`SimpleDictColumnarZipType`
+      is created by default.
+    """
+    if basetype is None:
+        basetype = SimpleDictColumnarZipType if columnar \
+          else SimpleDictZipType
+    elif columnar and not issubclass(basetype, SimpleDictColumnarZipType):
+        raise TypeError(
+          "Custom columnar `basetype` must be derived from %s." % repr(
+            SimpleDictColumnarZipType))
     if not issubclass(basetype, SimpleDictZipType):
         raise TypeError(
           "Custom `basetype` must be derived from %s." % repr(
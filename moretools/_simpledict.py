@@ -29,6 +29,7 @@ from six import with_metaclass
 
 __all__ = [
   'SimpleDictType', 'SimpleFrozenDictType', 'SimpleDictStructType',
+  'SimpleDictFieldsType',
   'simpledict', 'issimpledict', 'issimpledictclass',
   'issimplefrozendict', 'issimplefrozendictclass',
   'issimpledictstruct', 'issimpledictstructclass',
@@ -37,8 +38,11 @@ __all__ = [
 from warnings import warn
 from inspect import isclass
 import re as _re
+import threading
+import weakref
 
 from ._common import *
+from ._hamt import HAMT
 
 
 class KeyToAttrError(AttributeError):
@@ -62,6 +66,51 @@ class AttrToKeyToAttrMismatch(LookupError):
 AttrToKeyToAttrMismatch.__name__ = 'simpledict.AttrToKeyToAttrMismatch'
 
 
+class UnknownKeyError(KeyError):
+    pass
+
+UnknownKeyError.__name__ = 'simpledict.UnknownKeyError'
+
+
+class ConversionMemo(object):
+    """Bounded memo table of already validated
+       *key*<-->*attrname* conversions of a custom simpledict type family.
+
+    - Created by :func:`simpledict` with `memosize` entries per direction
+      and stored as CustomType.memo.
+    - Lookups are lock-free, insertions are locked.
+      If full, the oldest entry is dropped.
+    - `hits` counts the validations avoided, `misses` the ones done.
+      Both can undercount slightly under concurrent access.
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        # validated key --> attrname
+        self.attrnames = OrderedDict()
+        # validated attrname --> key
+        self.keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, table, key, value):
+        """Memoize a validated `key` --> `value` conversion in `table`.
+        """
+        with self._lock:
+            if len(table) >= self.maxsize:
+                table.popitem(last=False)
+            table[key] = value
+
+    def clear(self):
+        with self._lock:
+            self.attrnames.clear()
+            self.keys.clear()
+            self.hits = self.misses = 0
+
+    def __repr__(self):
+        return '%s(maxsize=%s, hits=%d, misses=%d)' % (
+          type(self).__name__, self.maxsize, self.hits, self.misses)
+
+
 class SimpleDictMeta(type):
     """The basic metaclass for :class:`SimpleDictType`.
 
@@ -75,6 +124,202 @@ class SimpleDictMeta(type):
     """
     _re_attrname = _re.compile('^[A-Za-z_][A-Za-z0-9_]*$')
 
+    memo = None
+    fields = None
+
+    def _validated_attr(cls, key):
+        """Get the checked attrname of `key`.
+
+        - *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+        """
+        memo = cls.memo
+        if memo is not None:
+            try:
+                attrname = memo.attrnames[key]
+            except KeyError:
+                pass
+            except TypeError: # unhashable
+                memo = None
+            else:
+                memo.hits += 1
+                return attrname
+        attrname = str(cls.key_to_attr(key))
+        # check attribute name validity
+        # *raises* `KeyToAttrError`
+        cls._check_attr(key, attrname)
+        # check reverse attr-->key conversion
+        # *raises* `KeyToAttrToKeyMismatch`
+        cls._reverse_check_key(key, attrname)
+        if memo is not None:
+            memo.misses += 1
+            memo.add(memo.attrnames, key, attrname)
+        return attrname
+
+    def _validated_key(cls, attrname):
+        """Get the checked key of `attrname`.
+
+        - *raises* `AttrToKeyToAttrMismatch`
+        """
+        memo = cls.memo
+        if memo is not None:
+            try:
+                key = memo.keys[attrname]
+            except KeyError:
+                pass
+            else:
+                memo.hits += 1
+                return key
+        key = cls.attr_to_key(attrname)
+        # check reverse key-->attr conversion
+        # *raises* `AttrToKeyToAttrMismatch`
+        cls._reverse_check_attr(attrname, key)
+        if memo is not None:
+            memo.misses += 1
+            memo.add(memo.keys, attrname, key)
+        return key
+
+    def from_records(cls, records, keys=None):
+        """Create a list of instances from many `records`.
+
+        - Records are mappings,
+          or sequences of values for the given `keys`.
+        - Every distinct key is only validated once per batch,
+          instead of once per instance.
+        - *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+          before creating any instance with an invalid key.
+        """
+        dicttype = cls.dicttype
+        if keys is not None:
+            keys = tuple(keys)
+            for key in keys:
+                cls._validated_attr(key)
+            nkeys = len(keys)
+            dicts = []
+            for values in records:
+                if len(values) != nkeys:
+                    raise ValueError(
+                      "Record %s doesn't match keys %s"
+                      % (repr(values), repr(keys)))
+                dicts.append(dicttype(zip(keys, values)))
+        else:
+            dicts = [dicttype(record) for record in records]
+            validated = set()
+            for __dict__ in dicts:
+                if not validated.issuperset(__dict__):
+                    for key in __dict__:
+                        if key not in validated:
+                            cls._validated_attr(key)
+                            validated.add(key)
+        return cls._from_validated(*dicts)
+
+    def fromkeys(cls, keys, value=None):
+        """Create an instance with all `keys` set to `value`,
+           like `dict.fromkeys`.
+        """
+        keys = list(keys)
+        for key in keys:
+            cls._validated_attr(key)
+        instance, = cls._from_validated(
+          cls.dicttype((key, value) for key in keys))
+        return instance
+
+    def _from_validated(cls, *dicts):
+        """Create a list of instances from internal mappings
+           with already validated keys, bypassing `__init__`.
+        """
+        if issubclass(cls, SimpleDictStructType):
+            raise TypeError(
+              "%s instances need a name and bases." % cls.__name__)
+        if issubclass(cls, SimpleDictFieldsType):
+            return [cls(__dict__) for __dict__ in dicts]
+        if issubclass(cls, _FrozenHAMTStorage):
+            return [cls._from_hamt(HAMT(__dict__)) for __dict__ in dicts]
+        new = cls.__new__
+        setdict = object.__setattr__
+        instances = []
+        for __dict__ in dicts:
+            self = new(cls)
+            setdict(self, '__dict__', __dict__)
+            instances.append(self)
+        return instances
+
+    def _from_hamt(cls, __map__, hashvalue=None):
+        """Create a frozen instance from a :class:`HAMT`
+           with already validated keys and its optional precomputed hash.
+        """
+        self = cls.__new__(cls)
+        object.__setattr__(self, '__map__', __map__)
+        object.__setattr__(self, '__hashvalue__', hashvalue)
+        return self
+
+    def set(cls, frozen, key, value):
+        """Get a new frozen simpledict like `frozen`
+           with `key` set to `value`.
+
+        - Takes O(log n) time, sharing all unchanged storage with `frozen`,
+          unless it has a fixed schema.
+        """
+        if not isinstance(frozen, SimpleFrozenDictType):
+            raise TypeError("%s is not frozen." % repr(frozen))
+        frozencls = type(frozen)
+        # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+        frozencls._validated_attr(key)
+        if not isinstance(frozen, _FrozenHAMTStorage):
+            items = dict(_simpledictitems(frozen))
+            items[key] = value
+            return frozencls(items)
+
+        __map__ = frozen.__map__
+        changed = __map__.set(key, value)
+        if changed is __map__:
+            return frozen
+        hashvalue = frozen.__hashvalue__
+        if hashvalue is not None:
+            try:
+                if key in __map__:
+                    hashvalue ^= hash((key, __map__[key]))
+                hashvalue ^= hash((key, value))
+            except TypeError: # unhashable value
+                hashvalue = None
+        return frozencls._from_hamt(changed, hashvalue)
+
+    def remove(cls, frozen, key):
+        """Get a new frozen simpledict like `frozen` without `key`.
+
+        - Takes O(log n) time, sharing all unchanged storage with `frozen`,
+          unless it has a fixed schema.
+        - *raises* `KeyError` if missing.
+        """
+        if not isinstance(frozen, SimpleFrozenDictType):
+            raise TypeError("%s is not frozen." % repr(frozen))
+        frozencls = type(frozen)
+        if not isinstance(frozen, _FrozenHAMTStorage):
+            items = dict(_simpledictitems(frozen))
+            del items[key]
+            return frozencls(items)
+
+        __map__ = frozen.__map__
+        value = __map__[key]
+        hashvalue = frozen.__hashvalue__
+        if hashvalue is not None:
+            hashvalue ^= hash((key, value))
+        return frozencls._from_hamt(__map__.remove(key), hashvalue)
+
+    def _set_unknown(cls, self, key, value):
+        """Store a value for a `key` which is no field
+           of a :class:`SimpleDictFieldsType` instance.
+
+        - *raises* `simpledict.UnknownKeyError` if not enabled
+          with the `unknown_keys` option.
+        """
+        if not cls.unknown_keys:
+            raise UnknownKeyError(key)
+        # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+        cls._validated_attr(key)
+        if _keywatchers and key not in self.__dict__:
+            _keyadded(self, key)
+        self.__dict__[key] = value
+
     def _check_attr(cls, key, attrname):
         """Check (`key`-->)`attrname` validity.
         """
@@ -125,13 +370,8 @@ class SimpleDictType(with_metaclass(SimpleDictMeta, object)):
         cls = type(self) # holds the helper methods and custom options
         self.__dict__ = cls.dicttype(mapping, **items)
         for key in self.__dict__.keys():
-            attrname = cls.key_to_attr(key)
-            # check attribute name validity
-            # *raises* `KeyToAttrError`
-            cls._check_attr(key, attrname)
-            # check reverse attr-->key conversion
-            # *raises* `KeyToAttrToKeyMismatch`
-            cls._reverse_check_key(key, attrname)
+            # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+            cls._validated_attr(key)
 
     def __getattr__(self, name):
         cls = type(self) # holds the helper methods and custom options
@@ -144,12 +384,14 @@ class SimpleDictType(with_metaclass(SimpleDictMeta, object)):
     def __setattr__(self, name, value):
         cls = type(self) # holds the helper methods and custom options
         if name.startswith('__'): # is real (internal) attribute?
+            if _keywatchers and name == '__dict__':
+                _keysreset(self, value)
+            if _flatteners:
+                _unflatten(self)
             object.__setattr__(self, name, value)
         else: # convert name to key and store in `self.__dict__`
-            key = cls.attr_to_key(name)
-            # check reverse key-->attr conversion
             # *raises* `AttrToKeyToAttrMismatch`
-            cls._reverse_check_attr(name, key)
+            key = cls._validated_key(name)
             # accept name/value pair
             self[key] = value
 
@@ -159,6 +401,10 @@ class SimpleDictType(with_metaclass(SimpleDictMeta, object)):
             raise AttributeError(name)
         key = cls.attr_to_key(name)
         del self.__dict__[key]
+        if _keywatchers:
+            _keyremoved(self, key)
+        if _flatteners:
+            _unflatten(self)
 
     def __dir__(self):
         cls = type(self) # holds the helper methods and custom options
@@ -170,6 +416,23 @@ class SimpleDictType(with_metaclass(SimpleDictMeta, object)):
         return iter(iter_func())
 
     def __contains__(self, item):
+        cls = type(self) # holds the helper methods and custom options
+        iterate = cls.iterate
+        if iterate.endswith('keys'):
+            try:
+                self[item]
+            except (KeyError, TypeError): # missing or unhashable
+                return False
+            return True
+        if iterate.endswith('items'):
+            if not isinstance(item, tuple) or len(item) != 2:
+                return False
+            key, value = item
+            try:
+                stored = self[key]
+            except (KeyError, TypeError): # missing or unhashable
+                return False
+            return stored is value or stored == value
         return item in iter(self)
 
     def __len__(self):
@@ -177,33 +440,228 @@ class SimpleDictType(with_metaclass(SimpleDictMeta, object)):
 
     def __setitem__(self, key, value):
         cls = type(self) # holds the helper methods and custom options
-        attrname = str(cls.key_to_attr(key))
-        # check attribute name validity
-        # *raises* `KeyToAttrError`
-        cls._check_attr(key, attrname)
-        # check reverse attr-->key conversion
-        # *raises* `KeyToAttrToKeyMismatch`
-        cls._reverse_check_key(key, attrname)
+        # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+        cls._validated_attr(key)
+        if _keywatchers and key not in self.__dict__:
+            _keyadded(self, key)
         # accept the key/value pair
         self.__dict__[key] = value
+        if _flatteners:
+            _unflatten(self)
 
     def __getitem__(self, key):
         return self.__dict__[key]
 
     def __delitem__(self, key):
         del self.__dict__[key]
+        if _keywatchers:
+            _keyremoved(self, key)
+        if _flatteners:
+            _unflatten(self)
 
     def __repr__(self):
         return 'simpledict(%s)' % repr(self.__dict__)
 
 
+def _fielditems(self):
+    """Iterate the (key, value) pairs of a :class:`SimpleDictFieldsType`
+       instance, with its fields first, in declaration order.
+    """
+    cls = type(self)
+    for key, slot in cls.fieldslots:
+        try:
+            yield key, slot.__get__(self, cls)
+        except AttributeError: # not set
+            pass
+    if cls.unknown_keys:
+        for item in self.__dict__.items():
+            yield item
+
+
+def _isset(self, slot):
+    """Check if `slot` of a :class:`SimpleDictFieldsType` instance is set.
+    """
+    try:
+        slot.__get__(self, type(self))
+    except AttributeError:
+        return False
+    return True
+
+
+def _simpledictitems(obj):
+    """Iterate the (key, value) pairs of any simpledict instance,
+       independent of its `iterate` option.
+    """
+    if isinstance(obj, SimpleDictFieldsType):
+        return _fielditems(obj)
+    if isinstance(obj, _FrozenHAMTStorage):
+        return obj.__map__.items()
+    return iter(obj.__dict__.items())
+
+
+def _simpledictget(obj, key, default=None):
+    """Get the value of `key` from the own storage of any simpledict
+       instance, or `default` if missing.
+    """
+    if isinstance(obj, SimpleDictFieldsType):
+        try:
+            return obj[key]
+        except KeyError:
+            return default
+    if isinstance(obj, _FrozenHAMTStorage):
+        return obj.__map__.get(key, default)
+    return obj.__dict__.get(key, default)
+
+
+def _itemshash(items):
+    """Get an order-independent hash value of (key, value) `items`,
+       which can be updated per item with XOR.
+    """
+    hashvalue = 0
+    for item in items:
+        hashvalue ^= hash(item)
+    return hashvalue
+
+
+class SimpleDictFieldsType(SimpleDictType):
+    """Like :class:`SimpleDictType`,
+       but storing the values of a fixed set of keys in `__slots__`
+       instead of a per-instance mapping.
+
+    - Custom fixed-schema simpledict types are generated by :func:`simpledict`
+      if `fields` are given.
+    - Unset fields behave like missing keys.
+    - Other keys raise `simpledict.UnknownKeyError`,
+      unless enabled with the `unknown_keys` option.
+      Then they are stored in the instance's real `__dict__`,
+      which is only created on first use.
+    """
+    def __init__(self, mapping=(), **items):
+        """Instantiate the SimpleDictFieldsType with optional initial values.
+        """
+        cls = type(self) # holds the helper methods and custom options
+        slots = cls.fieldslotsbykey
+        for key, value in chain(dict(mapping).items(), items.items()):
+            slot = slots.get(key)
+            if slot is not None:
+                slot.__set__(self, value)
+            else:
+                cls._set_unknown(self, key, value)
+
+    def __setattr__(self, name, value):
+        cls = type(self) # holds the helper methods and custom options
+        slot = cls.fieldslotsbyattr.get(name)
+        if slot is not None:
+            if _keywatchers and not _isset(self, slot):
+                _keyadded(self, cls.attr_to_key(name))
+            slot.__set__(self, value)
+            if _flatteners:
+                _unflatten(self)
+        else:
+            SimpleDictType.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        cls = type(self) # holds the helper methods and custom options
+        if name.startswith('__'): # is real (internal) attribute?
+            raise AttributeError(name)
+        del self[cls.attr_to_key(name)]
+
+    def __dir__(self):
+        cls = type(self) # holds the helper methods and custom options
+        return [cls.key_to_attr(key) for key, _ in _fielditems(self)]
+
+    def __iter__(self):
+        cls = type(self) # holds the helper methods and custom options
+        iterate = cls.iterate
+        if iterate.endswith('keys'):
+            return (key for key, _ in _fielditems(self))
+        if iterate.endswith('values'):
+            return (value for _, value in _fielditems(self))
+        return _fielditems(self)
+
+    def __len__(self):
+        cls = type(self) # holds the helper methods and custom options
+        count = 0
+        for _, slot in cls.fieldslots:
+            try:
+                slot.__get__(self, cls)
+            except AttributeError: # not set
+                continue
+            count += 1
+        if cls.unknown_keys:
+            count += len(self.__dict__)
+        return count
+
+    def __setitem__(self, key, value):
+        cls = type(self) # holds the helper methods and custom options
+        slot = cls.fieldslotsbykey.get(key)
+        if slot is not None:
+            if _keywatchers and not _isset(self, slot):
+                _keyadded(self, key)
+            slot.__set__(self, value)
+        else:
+            cls._set_unknown(self, key, value)
+        if _flatteners:
+            _unflatten(self)
+
+    def __getitem__(self, key):
+        cls = type(self) # holds the helper methods and custom options
+        slot = cls.fieldslotsbykey.get(key)
+        if slot is not None:
+            try:
+                return slot.__get__(self, cls)
+            except AttributeError: # not set
+                raise KeyError(key)
+        if not cls.unknown_keys:
+            raise KeyError(key)
+        return self.__dict__[key]
+
+    def __delitem__(self, key):
+        cls = type(self) # holds the helper methods and custom options
+        slot = cls.fieldslotsbykey.get(key)
+        if slot is not None:
+            try:
+                slot.__delete__(self)
+            except AttributeError: # not set
+                raise KeyError(key)
+        elif not cls.unknown_keys:
+            raise KeyError(key)
+        else:
+            del self.__dict__[key]
+        if _keywatchers:
+            _keyremoved(self, key)
+        if _flatteners:
+            _unflatten(self)
+
+    def __repr__(self):
+        return 'simpledict(%s)' % repr(dict(_fielditems(self)))
+
+    @classmethod
+    def type(cls, simpledicttype, attrnames):
+        """Create a base class with `__slots__` for the given `attrnames`.
+        """
+        class SimpleDictFieldsType(cls, simpledicttype):
+            __slots__ = tuple(attrnames)
+
+        return SimpleDictFieldsType
+
+
 class SimpleFrozenDictType(object):
     """Like :class:`SimpleDictType`,
-       but without support for setting values after instantiation.
+       but without support for changing items after instantiation.
 
     - Custom frozen simpledict types are generated
       together with the normal custom simpledict types in :func:`simpledict`,
       stored as CustomType.frozen.
+    - Instances are hashable if all values are,
+      and equal to instances of the same type with equal items.
+    - CustomType.set() and CustomType.remove()
+      create changed copies of frozen instances.
+    - Unless they have a fixed schema,
+      the items are stored in a :class:`moretools._hamt.HAMT`,
+      so changed copies share all unchanged storage
+      and the hash value is computed only once and then updated per item.
+      The iteration order then depends on the key hashes.
     """
     def __setattr__(self, name, value):
         if name.startswith('__'): # is real (internal) attribute?
@@ -214,20 +672,288 @@ class SimpleFrozenDictType(object):
     def __setitem__(self, name, value):
         raise NotImplementedError
 
+    def __delattr__(self, name):
+        raise NotImplementedError
+
+    def __delitem__(self, name):
+        raise NotImplementedError
+
+    def __reduce__(self):
+        # the default protocol would restore the state of an empty instance,
+        # which can't be changed, or isn't even able to look up `__setstate__`
+        # without endless `__getattr__` recursion
+        return type(self), (list(_simpledictitems(self)), )
+
+    def __hash__(self):
+        return _itemshash(_simpledictitems(self))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        for key, value in _simpledictitems(self):
+            try:
+                othervalue = other[key]
+            except KeyError:
+                return False
+            if not (othervalue is value or othervalue == value):
+                return False
+        return True
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
     @classmethod
     def type(cls, simpledicttype=SimpleDictType):
-        class SimpleFrozenDictType(cls, simpledicttype):
-            pass
+        if issubclass(simpledicttype, SimpleDictFieldsType):
+            class SimpleFrozenDictType(cls, simpledicttype):
+                pass
+
+        else:
+            class SimpleFrozenDictType(
+              _FrozenHAMTStorage, cls, simpledicttype):
+                pass
 
         return SimpleFrozenDictType
 
 
+class _FrozenHAMTStorage(object):
+    """Storage of :class:`SimpleFrozenDictType` items in a :class:`HAMT`
+       instead of the instance `__dict__`.
+    """
+    __slots__ = ['__map__', '__hashvalue__']
+
+    def __init__(self, mapping=(), **items):
+        cls = type(self) # holds the helper methods and custom options
+        __map__ = HAMT(cls.dicttype(mapping, **items))
+        for key in __map__:
+            # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+            cls._validated_attr(key)
+        self.__map__ = __map__
+        self.__hashvalue__ = None
+
+    def __getitem__(self, key):
+        return self.__map__[key]
+
+    def __iter__(self):
+        cls = type(self) # holds the helper methods and custom options
+        iterate = cls.iterate
+        if iterate.endswith('keys'):
+            return self.__map__.keys()
+        if iterate.endswith('values'):
+            return self.__map__.values()
+        return self.__map__.items()
+
+    def __len__(self):
+        return len(self.__map__)
+
+    def __dir__(self):
+        cls = type(self) # holds the helper methods and custom options
+        return [cls.key_to_attr(key) for key in self.__map__]
+
+    def __hash__(self):
+        hashvalue = self.__hashvalue__
+        if hashvalue is None:
+            hashvalue = self.__hashvalue__ = _itemshash(self.__map__.items())
+        return hashvalue
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        if self.__map__ is other.__map__:
+            return True
+        if self.__hashvalue__ is not None \
+          and other.__hashvalue__ is not None \
+          and self.__hashvalue__ != other.__hashvalue__:
+            return False
+        return self.__map__ == other.__map__
+
+    def __repr__(self):
+        return 'simpledict(%s)' % repr(dict(self.__map__.items()))
+
+
+# id(struct) --> (flattened mapping of all its items, weakref to struct)
+# (also used for the columns of columnar simpledictzips)
+_flattened = {}
+# id(simpledict) --> ids of structs with a flattened mapping depending on it
+_flatteners = {}
+# id(struct) --> ids of simpledicts its flattened mapping depends on
+_flatdependencies = {}
+
+
+def _forgetflat(holderid):
+    """Drop the flattened mapping of the struct with id `holderid`
+       and unregister it from all simpledicts it depends on.
+    """
+    _flattened.pop(holderid, None)
+    for objid in _flatdependencies.pop(holderid, ()):
+        holderids = _flatteners.get(objid)
+        if holderids is not None:
+            holderids.discard(holderid)
+            if not holderids:
+                del _flatteners[objid]
+
+
+def _unflatten(obj):
+    """Drop the flattened mappings of all structs depending on `obj`.
+    """
+    for structid in list(_flatteners.get(id(obj), ())):
+        _forgetflat(structid)
+
+
+def _resolution_order(struct):
+    """Get `struct` and all its bases resolved depth-first,
+       like item lookup does.
+
+    - Returns ``None`` if a base is no simpledict,
+      whose changes couldn't be tracked.
+    """
+    order = []
+    seen = set()
+    stack = [struct]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        if not isinstance(obj, SimpleDictType):
+            return None
+        seen.add(id(obj))
+        order.append(obj)
+        if isinstance(obj, SimpleDictStructType):
+            stack.extend(reversed(obj.__bases__))
+    return order
+
+
+def _cacheflat(holder, objs, build):
+    """Get the flattened representation of simpledicts `objs`
+       returned by `build()` and cache it for `holder`
+       until any of `objs` changes or `holder` is garbage collected.
+    """
+    holderid = id(holder)
+    ids = _flatdependencies[holderid] = set(map(id, objs))
+    # register before flattening to also catch changes in the meantime
+    for objid in ids:
+        _flatteners.setdefault(objid, set()).add(holderid)
+    try:
+        flat = build()
+    except BaseException:
+        _forgetflat(holderid)
+        raise
+
+    if _flatdependencies.get(holderid) is ids: # still unchanged?
+        _flattened[holderid] = flat, weakref.ref(
+          holder, lambda ref: _forgetflat(holderid))
+    return flat
+
+
+def _flatten(struct):
+    """Get the flattened mapping of all items of `struct`,
+       including the inherited ones.
+
+    - Caches the result until any simpledict
+      in the struct's resolution order changes.
+    - Returns ``None`` if a base is no simpledict,
+      whose changes couldn't be tracked.
+    """
+    order = _resolution_order(struct)
+    if order is None:
+        return None
+
+    def build():
+        flat = type(struct).dicttype()
+        for obj in reversed(order):
+            flat.update(_simpledictitems(obj))
+        return flat
+
+    return _cacheflat(struct, order, build)
+
+
+# id(simpledict) --> {id(watcher): weakref to watcher} of key watchers
+_keywatchers = {}
+
+
+def _watchkeys(obj, watcher):
+    """Register `watcher` for key insertions and removals of `obj`.
+
+    - `watcher` is only weakly referenced and gets unregistered
+      when garbage collected. It must provide
+      `.checkkey(obj, key)`, `.addkey(obj, key)`, `.removekey(obj, key)`
+      and `.resetkeys(obj, keys)` methods.
+    - `.checkkey()` and `.addkey()` are only called for keys new to `obj`.
+      `.checkkey()` is called for all watchers before any `.addkey()`
+      and before the value is stored, so it can veto the insertion
+      by raising an exception.
+    - `.resetkeys()` is called before `obj`'s whole storage
+      gets replaced.
+    """
+    objid = id(obj)
+    watcherid = id(watcher)
+
+    def forget(ref):
+        watchers = _keywatchers.get(objid)
+        if watchers is not None and watchers.get(watcherid) is ref:
+            del watchers[watcherid]
+            if not watchers:
+                del _keywatchers[objid]
+
+    _keywatchers.setdefault(objid, {})[watcherid] = weakref.ref(
+      watcher, forget)
+
+
+def _watchers(obj):
+    refs = _keywatchers.get(id(obj))
+    if not refs:
+        return []
+    return [w for w in (ref() for ref in list(refs.values()))
+            if w is not None]
+
+
+def _keyadded(obj, key):
+    """Notify the watchers of `obj` about a `key` about to be stored.
+    """
+    watchers = _watchers(obj)
+    for watcher in watchers:
+        watcher.checkkey(obj, key)
+    for watcher in watchers:
+        watcher.addkey(obj, key)
+
+
+def _keyremoved(obj, key):
+    """Notify the watchers of `obj` about a removed `key`.
+    """
+    for watcher in _watchers(obj):
+        watcher.removekey(obj, key)
+
+
+def _keysreset(obj, mapping):
+    """Notify the watchers of `obj` about its whole storage
+       being replaced with `mapping`.
+    """
+    watchers = _watchers(obj)
+    if watchers:
+        keys = list(mapping.keys())
+        for watcher in watchers:
+            watcher.resetkeys(obj, keys)
+
+
 class SimpleDictStructType(object):
     """Like :class:`SimpleDictType`,
        but with support for dynamic item inheritance from other simpledicts,
        which acts like member inheritance from base classes.
 
-    - Calling creates a new basic simpledict from all inherited items.
+    - Calling creates a new basic simpledict from all inherited items,
+      or a `.frozen` one with ``frozen=True``.
+    - If all bases are simpledicts, all items are resolved once
+      into a cached flat mapping, which is dropped again
+      on item or attribute changes of the struct or any of its bases.
     - Custom simpledict struct types are generated
       together with the normal custom simpledict types in :func:`simpledict`,
       stored as CustomType.struct.
@@ -241,6 +967,13 @@ class SimpleDictStructType(object):
 
     def __getitem__(self, name):
         cls = type(self)
+        try:
+            flat = _flattened[id(self)][0]
+        except KeyError:
+            flat = _flatten(self)
+        if flat is not None:
+            return flat[name]
+
         try:
             return cls.base.__getitem__(self, name)
         except KeyError:
@@ -253,10 +986,19 @@ class SimpleDictStructType(object):
 
     def __iter__(self):
         cls = type(self)
-        try:
-            __dict__ = cls.dicttype(self.__bases__[-1])
-        except IndexError:
+        if not self.__bases__:
             return cls.base.__iter__(self)
+
+        try:
+            flat = _flattened[id(self)][0]
+        except KeyError:
+            flat = _flatten(self)
+        if flat is not None:
+            # changes don't affect this iteration,
+            # since they only drop the flat mapping from the cache
+            return iter(flat.items())
+
+        __dict__ = cls.dicttype(self.__bases__[-1])
         for base in self.__bases__[-2::-1]:
             __dict__.update(base)
         __dict__.update(cls.base.__iter__(self))
@@ -269,9 +1011,29 @@ class SimpleDictStructType(object):
             names.update(dir(base))
         return list(names)
 
-    def __call__(self):
-        #TODO
-        raise NotImplementedError
+    def __call__(self, frozen=False):
+        """Create a new basic simpledict from all inherited items.
+
+        - Items of bases from the same :func:`simpledict` call
+          are not validated again.
+        """
+        cls = type(self)
+        newcls = cls.frozen if frozen else cls.plain
+        try:
+            flat = _flattened[id(self)][0]
+        except KeyError:
+            flat = _flatten(self)
+        if flat is None: # items of other bases need validation
+            return newcls(iter(self))
+
+        metaclass = type(cls) # shared by all types with the same conversions
+        for obj in _resolution_order(self):
+            if type(type(obj)) is not metaclass:
+                for key, _ in _simpledictitems(obj):
+                    # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+                    cls._validated_attr(key)
+        instance, = newcls._from_validated(cls.dicttype(flat))
+        return instance
 
     def __repr__(self):
         return self.__name__
@@ -289,7 +1051,8 @@ def simpledict(
   key_to_attr=lambda key: key, attr_to_key=lambda name: name,
   base=SimpleDictType, frozenbase=SimpleFrozenDictType,
   structbase=SimpleDictStructType,
-  extra={},
+  fields=None, unknown_keys=False, fieldsbase=SimpleDictFieldsType,
+  memosize=1024, extra={},
   #DEPRECATED:
   basetype=None, frozenbasetype=None, basestructtype=None,
   ):
@@ -300,6 +1063,16 @@ def simpledict(
       used for items' *key*-->*attrname* conversions.
     :param attr_to_key: The *function*
       used for items' *attrname*-->*key* conversions.
+    :param fields: The *keys* of a fixed schema,
+      whose values are stored in `__slots__`
+      of a :class:`SimpleDictFieldsType`-derived type
+      instead of a per-instance mapping.
+      Such types have no `.struct` type.
+    :param unknown_keys: Allow other keys than the `fields`.
+    :param memosize: The maximum number of validated conversions
+      memoized per direction in a :class:`ConversionMemo`,
+      shared by the custom type and its `.frozen` and `.struct` types.
+      ``None`` or ``0`` disables memoizing.
     """
     if basetype:
         warn("Use base= instead of basetype=.", DeprecationWarning)
@@ -319,12 +1092,29 @@ def simpledict(
       iterate=iterate,
       key_to_attr=staticmethod(key_to_attr),
       attr_to_key=staticmethod(attr_to_key),
+      memo=ConversionMemo(memosize) if memosize else None,
+      unknown_keys=unknown_keys,
       #DEPRECATED:
       basetype=base,
       frozenbasetype=frozenbase,
       basestructtype=structbase,
       )
     metaclass = type(typename + 'Meta', (SimpleDictMeta,), metaclassattrs)
+    # a fixed schema needs a slotted base type for all other types
+    if fields is not None:
+        fields = tuple(fields)
+        # validate fields with the conversion helpers of the new types,
+        # which are only available at class level
+        checker = metaclass(typename, (object, ), {})
+        # *raises* `KeyToAttrError` or `KeyToAttrToKeyMismatch`
+        attrnames = [checker._validated_attr(key) for key in fields]
+        base = fieldsbase.type(base, attrnames)
+        slots = [base.__dict__[name] for name in attrnames]
+        metaclass.fields = fields
+        metaclass.fieldslots = tuple(zip(fields, slots))
+        metaclass.fieldslotsbykey = dict(zip(fields, slots))
+        metaclass.fieldslotsbyattr = dict(zip(attrnames, slots))
+        structbase = basestructtype = None
     # then create a frozen simpledict type ...
     if frozenbasetype:
         warn("Use frozenbase= instead of frozenbasetype=.",
@@ -344,17 +1134,20 @@ def simpledict(
         metaclass.struct = metaclass(
           typename + '.struct', (structbase,), {})
     # finally create the normal simpledict type from the custom meta type
-    return metaclass(typename, (base,), {})
+    metaclass.plain = metaclass(typename, (base,), {})
+    return metaclass.plain
 
 
 simpledict.base = SimpleDictType
 simpledict.frozenbase = SimpleFrozenDictType
 simpledict.structbase = SimpleDictStructType
+simpledict.fieldsbase = SimpleDictFieldsType
 
 
 simpledict.KeyToAttrError = KeyToAttrError
 simpledict.KeyToAttrToKeyMismatch = KeyToAttrToKeyMismatch
 simpledict.AttrToKeyToAttrMismatch = AttrToKeyToAttrMismatch
+simpledict.UnknownKeyError = UnknownKeyError
 
 
 def issimpledict(obj):
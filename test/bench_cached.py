@@ -0,0 +1,60 @@
+"""Benchmark the per-hit overhead of moretools' @cached
+   against functools.lru_cache (Python 3 only).
+
+Run with ``python test/bench_cached.py``.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+from __future__ import print_function
+
+import timeit
+from functools import lru_cache
+
+from moretools import cached
+
+
+def one(arg):
+    return arg
+
+
+def two(arg, other=None):
+    return arg
+
+
+def kwargs(arg, **kwargs):
+    return arg
+
+
+CASES = [
+  ('one(1)', one, (1, ), {}),
+  ('two(1, 2)', two, (1, 2), {}),
+  ('two(1, other=2)', two, (1, ), {'other': 2}),
+  ('kwargs(1, key=2)', kwargs, (1, ), {'key': 2}),
+  ]
+
+DECORATORS = [
+  ('lru_cache(maxsize=None)', lru_cache(maxsize=None)),
+  ('lru_cache(maxsize=128)', lru_cache(maxsize=128)),
+  ('cached', cached),
+  ('cached(maxsize=128)', cached(maxsize=128)),
+  ('cached(maxsize=128, policy=\'fifo\')',
+   cached(maxsize=128, policy='fifo')),
+  ('cached(threadsafe=True)', cached(threadsafe=True)),
+  ]
+
+
+def bench(number=1000000, repeat=5):
+    for title, func, args, kwargs in CASES:
+        print(title)
+        for name, deco in DECORATORS:
+            wrapper = deco(func)
+            wrapper(*args, **kwargs) # fill cache
+            best = min(timeit.repeat(
+              lambda: wrapper(*args, **kwargs),
+              number=number, repeat=repeat))
+            print("  %-36s %6.1f ns/hit" % (name, best / number * 1e9))
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,59 @@
+"""Benchmark building many simpledict instances
+   with ``SD(...)`` against ``SD.from_records(...)``,
+   and the memory used by dict-backed against fixed-schema instances.
+
+Run with ``python test/bench_simpledict.py``.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+from __future__ import print_function
+
+import timeit
+import tracemalloc
+
+from moretools import simpledict
+
+
+KEYS = ('id', 'name', 'value', 'flag')
+
+
+def bench(number=1000000, repeat=3):
+    SD = simpledict('SD')
+    rows = [(i, 'name', i * 0.5, True) for i in range(number)]
+    records = [dict(zip(KEYS, row)) for row in rows]
+    CASES = [
+      ('[SD(record) for record in records]',
+       lambda: [SD(record) for record in records]),
+      ('SD.from_records(records)',
+       lambda: SD.from_records(records)),
+      ('SD.from_records(rows, keys=KEYS)',
+       lambda: SD.from_records(rows, keys=KEYS)),
+      ]
+    print("%d instances with %d keys" % (number, len(KEYS)))
+    for title, func in CASES:
+        best = min(timeit.repeat(func, number=1, repeat=repeat))
+        print("  %-36s %6.2f s (%4.0f ns/instance)"
+              % (title, best, best / number * 1e9))
+
+
+def bench_memory(number=100000):
+    print("memory of %d instances with %d keys" % (number, len(KEYS)))
+    rows = [(i, 'name', i * 0.5, True) for i in range(number)]
+    for title, SD in [
+      ("simpledict('SD')", simpledict('SD')),
+      ("simpledict('SD', fields=KEYS)", simpledict('SD', fields=KEYS)),
+      ("simpledict('SD', fields=KEYS, unknown_keys=True)",
+       simpledict('SD', fields=KEYS, unknown_keys=True)),
+      ]:
+        tracemalloc.start()
+        instances = SD.from_records(rows, keys=KEYS)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del instances
+        print("  %-48s %4.0f bytes/instance" % (title, size / number))
+
+
+if __name__ == '__main__':
+    bench()
+    bench_memory()
@@ -0,0 +1,12 @@
+"""
+Test collection setup for the moretools tests.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import sys
+
+
+collect_ignore = []
+if sys.version_info < (3, 5): # no async/await syntax
+    collect_ignore.extend(['test_cached_async.py', 'test_lazy_async.py'])
@@ -0,0 +1,539 @@
+"""Test the moretools._cached module.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import pytest
+
+from moretools import cached
+
+
+def test_cached():
+    """Test default @cached behavior of storing all results forever.
+    """
+    calls = []
+
+    @cached
+    def func(arg):
+        calls.append(arg)
+        return arg * 2
+
+    assert [func(1), func(2), func(1)] == [2, 4, 2]
+    assert calls == [1, 2]
+    assert func.results == {1: 2, 2: 4}
+    assert func.cache_info() == cached.CacheInfo(
+      hits=1, misses=2, evictions=0, maxsize=None, currsize=2)
+
+    @cached
+    def func():
+        calls.append(None)
+        return 42
+
+    assert [func(), func()] == [42, 42]
+    assert func.cache_info() == (1, 1, 0, None, 1)
+
+
+def test_cached_fifo():
+    """Test @cached(maxsize=..., policy='fifo') eviction order.
+    """
+    @cached(maxsize=2, policy='fifo')
+    def func(*args):
+        return sum(args)
+
+    func(1)
+    func(2)
+    func(1)
+    func(3)
+    assert list(func.results) == [(2,), (3,)]
+    assert func.cache_info() == (1, 3, 1, 2, 2)
+
+
+def test_cached_lru():
+    """Test @cached(maxsize=...) default 'lru' eviction order.
+    """
+    @cached(maxsize=2)
+    def func(arg):
+        return arg
+
+    func(1)
+    func(2)
+    func(1)
+    func(3)
+    assert list(func.results) == [1, 3]
+    assert func.cache_info().evictions == 1
+
+
+def test_cached_lfu():
+    """Test @cached(maxsize=..., policy='lfu') eviction order.
+    """
+    @cached(maxsize=2, policy='lfu')
+    def func(arg, **kwargs):
+        return arg
+
+    func(1)
+    func(1)
+    func(1)
+    func(2)
+    func(3)
+    func(3)
+    func(4)
+    keys = set(key for key, _ in func.results)
+    assert keys == {(1,), (4,)}
+    assert func.cache_info() == (3, 4, 2, 2, 2)
+
+
+def test_cached_zero_maxsize():
+    """Test that @cached(maxsize=0) doesn't store anything.
+    """
+    @cached(maxsize=0)
+    def func(arg):
+        return arg
+
+    assert func(1) == func(1) == 1
+    assert func.cache_info() == (0, 2, 0, 0, 0)
+
+    @cached(maxsize=0)
+    def func():
+        return 1
+
+    assert func() == func() == 1
+    assert func.cache_info() == (0, 2, 0, 0, 0)
+
+
+def test_cached_invalid_policy():
+    with pytest.raises(ValueError):
+        cached(maxsize=1, policy='random')(lambda arg: arg)
+
+
+def test_cached_ttl():
+    """Test @cached(ttl=...) result expiry.
+    """
+    now = [0]
+
+    calls = []
+
+    @cached(ttl=10)
+    def func(arg):
+        calls.append(arg)
+        return arg
+
+    func.results.timer = lambda: now[0]
+    func(1)
+    func(1)
+    now[0] = 5
+    func(2)
+    now[0] = 10
+    func(1)
+    assert calls == [1, 2, 1]
+    assert func.results.expirations == 1
+    now[0] = 15
+    func.results.purge()
+    assert list(func.results) == [1]
+    assert func.results.expirations == 2
+    now[0] = 20
+    assert len(func.results) == 0 and func.cache_info().currsize == 0
+    assert func.results.expirations == 3
+
+    @cached(ttl=10)
+    def func():
+        calls.append(None)
+
+    func.results.timer = lambda: now[0]
+    func()
+    func()
+    now[0] = 30
+    func()
+    assert calls.count(None) == 2
+
+
+def test_cached_ttl_sweep():
+    """Test background purging of expired results with @cached(sweep=...).
+    """
+    import time
+
+    @cached(ttl=0.01, sweep=0.01)
+    def func(arg):
+        return arg
+
+    func(1)
+    for _ in range(100):
+        if not len(func.results):
+            break
+        time.sleep(0.01)
+    assert not len(func.results)
+    assert func.results.expirations == 1
+
+
+@pytest.mark.parametrize('maxsize', [None, 8])
+def test_cached_threadsafe(maxsize):
+    """Test that concurrent @cached(threadsafe=True) calls
+       missing the same key only compute the result once.
+    """
+    import threading
+    import time
+
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    @cached(maxsize=maxsize, threadsafe=True)
+    def func(arg):
+        calls.append(arg)
+        started.set()
+        release.wait()
+        if arg is None:
+            raise ValueError(arg)
+        return arg * 2
+
+    for arg in [1, None]:
+        started.clear()
+        release.clear()
+        results = []
+        entered = []
+
+        def call():
+            entered.append(None)
+            try:
+                results.append(func(arg))
+            except ValueError as exc:
+                results.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        started.wait()
+        while len(entered) < 32:
+            time.sleep(0.001)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(results) == 32
+        if arg is None:
+            assert all(isinstance(r, ValueError) for r in results)
+        else:
+            assert results == [2] * 32
+    assert calls == [1, None]
+    info = func.cache_info()
+    assert info.misses == 2 and info.currsize == 1
+
+
+class FailingResults(dict):
+
+    def __setitem__(self, key, value):
+        raise RuntimeError(key)
+
+
+@pytest.mark.parametrize('failing', ['results', 'tags'])
+def test_cached_threadsafe_failing_store(failing):
+    """Test that concurrent @cached(threadsafe=True) callers
+       are released when storing or tagging a result fails.
+    """
+    import threading
+    import time
+
+    started = threading.Event()
+    release = threading.Event()
+
+    def failingtags(arg):
+        raise RuntimeError(arg)
+
+    options = {'results': FailingResults()} if failing == 'results' \
+      else {'tags': failingtags}
+
+    @cached(threadsafe=True, **options)
+    def func(arg):
+        started.set()
+        release.wait()
+        return arg * 2
+
+    results = []
+
+    def call():
+        try:
+            results.append(func(1))
+        except RuntimeError as exc:
+            results.append(exc)
+
+    def run(count):
+        threads = [threading.Thread(target=call) for _ in range(count)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        started.wait()
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+            assert not thread.is_alive()
+
+    run(8)
+    assert len(results) == 8
+    assert all(isinstance(r, RuntimeError) for r in results)
+    # no stale flight left behind
+    run(1)
+    assert len(results) == 9 and isinstance(results[-1], RuntimeError)
+
+
+
+@pytest.mark.parametrize('serializer', ['pickle', 'json'])
+def test_cached_sqlite(tmpdir, serializer):
+    """Test persistent @cached(results=cached.SQLiteResults(...)).
+    """
+    serializer = __import__(serializer)
+    path = str(tmpdir.join('cache.db'))
+    calls = []
+
+    def func(arg, other='other'):
+        calls.append(arg)
+        return [arg, other]
+
+    for _ in range(2): # simulate process restart
+        results = cached.SQLiteResults(path, 'func', serializer=serializer)
+        wrapped = cached(results=results)(func)
+        assert wrapped('arg') == ['arg', 'other']
+        assert wrapped('arg') == ['arg', 'other']
+        results.close()
+    assert calls == ['arg']
+
+    results = cached.SQLiteResults(path, 'func', serializer=serializer)
+    assert len(results) == 1
+    results.clear()
+    assert not len(results)
+    with pytest.raises(ValueError):
+        cached.SQLiteResults(path, 'invalid name')
+    with pytest.raises(ValueError):
+        cached(results=results, maxsize=1)(func)
+
+
+def test_cached_keys():
+    """Test that @cached normalizes positional and keyword calls
+       to the same key.
+    """
+    calls = []
+
+    @cached
+    def func(key, other=2, *args, **kwargs):
+        calls.append(key)
+        return key
+
+    assert func.__name__ == 'func'
+    func(1)
+    func(1, 2)
+    func(key=1, other=2)
+    func(other=2, key=1)
+    func(1, x=3, y=4)
+    func(1, y=4, x=3)
+    assert calls == [1, 1]
+    assert set(func.results) == {((1, 2), ()), ((1, 2), (('x', 3), ('y', 4)))}
+    assert func.cache_info().hits == 4
+
+
+@pytest.mark.parametrize('syntax', [True, False])
+def test_cached_positional_only(monkeypatch, syntax):
+    """Test @cached with positional-only parameters,
+       also on Python versions without syntax for them.
+    """
+    from moretools import _cached
+
+    monkeypatch.setattr(_cached, '_POSITIONAL_ONLY_SYNTAX', syntax)
+    func = cached(divmod)
+    assert func(7, 2) == func(7, 2) == (3, 1)
+    assert func.cache_info().hits == 1
+    with pytest.raises(TypeError):
+        func(7, y=2)
+
+
+def test_cached_method():
+    """Test per-instance results of @cached.method.
+    """
+    import gc
+    import weakref
+
+    calls = []
+
+    class Class(object):
+        @cached.method
+        def method(self, arg, other=None):
+            calls.append((self, arg))
+            return arg
+
+        @cached.method(maxsize=1)
+        def bounded(self, arg):
+            return arg
+
+        varargs = cached.method(lambda *args: args[1:])
+
+    class Slotted(object):
+        __slots__ = ['__weakref__']
+
+        method = Class.__dict__['method']
+        varargs = Class.__dict__['varargs']
+
+    for cls in [Class, Slotted]:
+        del calls[:]
+        obj, other = cls(), cls()
+        assert obj.method(1) == obj.method(arg=1) == other.method(1) == 1
+        assert calls == [(obj, 1), (other, 1)]
+        assert obj.method.results == {(1, None): 1}
+        assert obj.method.cache_info().hits == 1
+        # the wrapper source is only compiled once
+        assert obj.method.__code__ is other.method.__code__
+        assert obj.varargs(1, 2) == obj.varargs(1, 2) == (1, 2)
+        assert obj.varargs.cache_info().hits == 1
+        del calls[:]
+        ref = weakref.ref(obj)
+        del obj
+        gc.collect()
+        assert ref() is None
+
+    obj = Class()
+    obj.bounded(1)
+    obj.bounded(2)
+    assert obj.bounded.cache_info().evictions == 1
+
+    class Unreferenceable(object):
+        __slots__ = []
+
+        method = Class.__dict__['method']
+
+    with pytest.raises(TypeError) as exc:
+        Unreferenceable().method
+    assert '__weakref__' in str(exc.value)
+
+
+def test_cached_property():
+    """Test @cached.property only computing once per instance.
+    """
+    calls = []
+
+    class Class(object):
+        @cached.property
+        def prop(self):
+            """Docstring."""
+            calls.append(self)
+            return len(calls)
+
+    obj, other = Class(), Class()
+    assert [obj.prop, obj.prop, other.prop] == [1, 1, 2]
+    assert obj.__dict__ == {'prop': 1}
+    assert Class.prop.__doc__ == "Docstring."
+    del obj.prop
+    assert obj.prop == 3
+
+
+def test_cached_stats():
+    """Test @cached wrapper registry and detailed reports.
+    """
+    @cached(maxsize=8, hotkeys=2)
+    def func(arg):
+        return arg
+
+    for arg in [1, 1, 1, 2, 2, 3, 3, 3, 3]:
+        func(arg)
+    report = func.cache_stats()
+    assert report.name.endswith('.func')
+    assert (report.hits, report.misses, report.currsize) == (6, 3, 3)
+    assert report.ratio == 6.0 / 9
+    assert sum(count for _, count in report.latencies) == 3
+    assert report.memory > 0
+    assert report.hotkeys == [(3, 3), (1, 2)]
+
+    reports = []
+    assert report in cached.stats(reports.append)
+    assert report in reports
+
+    @cached(results=cached.SQLiteResults(':memory:'))
+    def func(arg):
+        return arg
+
+    func(1)
+    assert func.cache_stats().memory is None
+
+    for hotkeys in [0, -1]:
+        with pytest.raises(ValueError):
+            cached(hotkeys=hotkeys)(func)
+
+
+def test_cached_structural():
+    """Test @cached(structural=True) with unhashable arguments.
+    """
+    from moretools import simpledict
+
+    calls = []
+
+    @cached(structural=True)
+    def func(arg, *args):
+        calls.append(arg)
+        return len(arg)
+
+    shared = [1, 2]
+    assert func([1, 2]) == func([1, 2]) == 2
+    assert func((1, 2)) == 2
+    assert func({'a': [1], 'b': {2}}) == func({'b': {2}, 'a': [1]}) == 2
+    assert func([shared, shared]) == func([[1, 2], [1, 2]]) == 2
+    assert len(calls) == 4
+
+    SD = simpledict('SD')
+    assert func(SD(a=1)) == func(SD(a=1)) == 1
+    assert len(calls) == 5
+
+    recursive = []
+    recursive.append(recursive)
+    with pytest.raises(ValueError):
+        func(recursive)
+
+    @cached
+    def func(arg):
+        return arg
+
+    with pytest.raises(TypeError):
+        func([])
+
+
+def test_cached_invalidate():
+    """Test @cached result invalidation by arguments, tags and clear().
+    """
+    calls = []
+
+    @cached(tags=lambda user, field='name': ['user:%s' % user])
+    def get(user, field='name'):
+        calls.append((user, field))
+        return user
+
+    @cached(maxsize=4, tags=lambda user: ['user:%s' % user, 'users'])
+    def other(user):
+        calls.append(user)
+        return user
+
+    get(1)
+    get(1, 'mail')
+    get(2)
+    other(1)
+    other(2)
+    assert get.invalidate(user=1, field='mail')
+    assert not get.invalidate(1, 'mail')
+    assert len(get.results) == 2
+    assert cached.invalidate_tag('user:1') == 2
+    assert list(get.results) == [(2, 'name')]
+    assert list(other.results) == [2]
+    assert cached.invalidate_tag('user:1') == 0
+    assert cached.invalidate_tag('users') == 1
+    del calls[:]
+    get(1)
+    get(2)
+    assert calls == [(1, 'name')]
+    get.clear()
+    assert not len(get.results)
+    assert cached.invalidate_tag('user:2') == 0
+
+    @cached
+    def func():
+        return 1
+
+    func()
+    assert func.invalidate()
+    assert not func.invalidate()
+    func()
+    assert func.clear() is None
+    assert func.cache_info().currsize == 0
@@ -0,0 +1,63 @@
+"""Test the moretools._cached module with coroutine functions.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import asyncio
+
+import pytest
+
+from moretools import cached
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_cached_coroutine():
+    """Test @cached coroutine functions sharing one computation per key.
+    """
+    calls = []
+
+    @cached(maxsize=8)
+    async def func(arg):
+        calls.append(arg)
+        await asyncio.sleep(0.01)
+        if arg is None:
+            raise ValueError(arg)
+        return arg * 2
+
+    async def main():
+        results = await asyncio.gather(*(func(1) for _ in range(8)))
+        assert results == [2] * 8
+        assert await func(1) == 2
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await func(None)
+
+    run(main())
+    assert calls == [1, None, None]
+    info = func.cache_info()
+    assert info.hits == 8 and info.misses == 3 and info.currsize == 1
+
+
+def test_cached_coroutine_cancel():
+    """Test that cancelling one awaiter doesn't cancel the computation.
+    """
+    @cached
+    async def func(arg):
+        await asyncio.sleep(0.01)
+        return arg
+
+    async def main():
+        first = asyncio.ensure_future(func(1))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await func(1) == 1
+
+    run(main())
+    assert func.results[1].result() == 1
@@ -0,0 +1,60 @@
+"""Test the moretools._hamt module.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import random
+
+import pytest
+
+from moretools._hamt import HAMT
+
+
+class Key(object):
+    """A key with a custom hash value to force collisions.
+    """
+    def __init__(self, value, hashvalue):
+        self.value = value
+        self.hashvalue = hashvalue
+
+    def __hash__(self):
+        return self.hashvalue
+
+    def __eq__(self, other):
+        return isinstance(other, Key) \
+          and (self.value, self.hashvalue) == (other.value, other.hashvalue)
+
+
+def test_hamt():
+    """Test HAMT against dict with random changes, keeping all versions.
+    """
+    rand = random.Random(0)
+    hamt = HAMT()
+    expected = {}
+    versions = []
+    for _ in range(2000):
+        key = rand.choice([
+          rand.randrange(100), 'key%d' % rand.randrange(100),
+          Key(rand.randrange(20), rand.choice([1, 33, 2 ** 64 + 1]))])
+        if rand.random() < 0.6:
+            value = rand.random()
+            hamt = hamt.set(key, value)
+            expected[key] = value
+        elif key in expected:
+            hamt = hamt.remove(key)
+            del expected[key]
+        else:
+            with pytest.raises(KeyError):
+                hamt.remove(key)
+        versions.append((hamt, dict(expected)))
+    for hamt, expected in versions[::10]:
+        assert len(hamt) == len(expected)
+        assert dict(hamt.items()) == expected
+        assert all(hamt[key] == value for key, value in expected.items())
+        assert hamt == HAMT(expected)
+
+    hamt = HAMT({'a': 1})
+    changed = hamt.set('b', 2)
+    assert changed.set('b', 2) is changed and hamt.set('a', 1) is hamt
+    assert changed.remove('b') == hamt
+    assert 'b' not in hamt and hamt.get('b', 2) == 2
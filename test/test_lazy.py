@@ -0,0 +1,290 @@
+"""Test the moretools._lazy module.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import pickle
+import threading
+import time
+
+import pytest
+
+from moretools import Lazy, LazyDict, BoundedLazyDict, ThreadSafeLazyDict
+
+
+def test_lazydict():
+    """Test basic LazyDict evaluation on first access.
+    """
+    calls = []
+
+    def func(arg):
+        calls.append(arg)
+        return arg
+
+    lazy = LazyDict(value=1, lazy=Lazy(func, 2), call=Lazy(func))
+    assert list(lazy.values()) == [1]
+    assert lazy['lazy'] == lazy['lazy'] == 2
+    assert lazy.call('call', 3) == lazy['call'] == 3
+    assert calls == [2, 3]
+    assert dict(lazy.items()) == {'value': 1, 'lazy': 2, 'call': 3}
+
+
+def access_concurrently(lazy, key, count=16):
+    """Access `key` of `lazy` from `count` threads at once
+       and return the results or exceptions.
+    """
+    results = []
+
+    def access():
+        try:
+            results.append(lazy[key])
+        except Exception as exc:
+            results.append(exc)
+
+    threads = [threading.Thread(target=access) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+@pytest.mark.parametrize('cache_failures', [False, True])
+def test_threadsafelazydict(cache_failures):
+    """Test that ThreadSafeLazyDict evaluates values only once.
+    """
+    calls = []
+
+    def func(arg):
+        calls.append(arg)
+        time.sleep(0.05)
+        if arg is None:
+            raise ValueError(arg)
+        return arg
+
+    class Dict(ThreadSafeLazyDict):
+        pass
+
+    Dict.cache_failures = cache_failures
+    lazy = Dict(value=Lazy(func, 1), error=Lazy(func, None))
+    assert access_concurrently(lazy, 'value') == [1] * 16
+    assert calls == [1]
+    errors = access_concurrently(lazy, 'error')
+    assert all(isinstance(error, ValueError) for error in errors)
+    with pytest.raises(ValueError):
+        lazy['error']
+    assert calls.count(None) == (1 if cache_failures else 2)
+
+    lazy['error'] = Lazy(func, 2)
+    assert lazy['error'] == 2
+
+
+def test_threadsafelazydict_prefetch():
+    """Test concurrent ThreadSafeLazyDict.prefetch() evaluation.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    calls = []
+    release = threading.Event()
+
+    def func(arg):
+        calls.append(arg)
+        release.wait()
+        return arg
+
+    lazy = ThreadSafeLazyDict(
+      (key, Lazy(func, key)) for key in range(8))
+    lazy['plain'] = 'plain'
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = lazy.prefetch(executor=executor)
+        assert sorted(futures) == list(range(8))
+        assert lazy.prefetch() == {}
+        # access while in flight waits instead of recomputing
+        results = []
+        thread = threading.Thread(target=lambda: results.append(lazy[3]))
+        thread.start()
+        release.set()
+        thread.join()
+        assert results == [3]
+        assert sorted(f.result() for f in as_completed(futures.values())) \
+          == list(range(8))
+    assert sorted(calls) == list(range(8))
+    assert dict(lazy.items()) == dict(
+      [(key, key) for key in range(8)] + [('plain', 'plain')])
+
+    lazy = ThreadSafeLazyDict(one=Lazy(int, '1'), two=Lazy(int, 'two'))
+    futures = lazy.prefetch(['one', 'two'])
+    assert futures['one'].result() == 1
+    with pytest.raises(ValueError):
+        futures['two'].result()
+    with pytest.raises(ValueError):
+        lazy['two']
+
+
+def test_lazydict_requires():
+    """Test dependency-aware LazyDict evaluation and invalidation.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    calls = []
+
+    def add(*args):
+        calls.append(args)
+        return sum(args)
+
+    lazy = LazyDict(
+      a=1, b=Lazy(add, 1), c=Lazy.on(['a', 'b'], add),
+      d=Lazy.on(['c'], add, 10), e=Lazy.on(['b'], add))
+    assert lazy['d'] == 12
+    assert calls == [(1,), (1, 1), (10, 2)]
+    assert 'e' not in dict(lazy.items())
+
+    lazy['a'] = 2
+    assert sorted(lazy.invalidate('a')) == ['c', 'd']
+    assert dict(lazy.items()) == {'a': 2, 'b': 1}
+    assert lazy.call('d') == 13
+    lazy['d'] = 0
+    assert lazy.invalidate('b') == ['c']  # only re-arms unchanged values
+    assert lazy.call('c', 1) == 4  # extra args come after requirements
+    assert lazy['e'] == 1 and lazy.invalidate('e') == []
+
+    lazy = LazyDict(
+      a=Lazy.on(['c'], add), b=Lazy.on(['a'], add), c=Lazy.on(['b'], add),
+      d=Lazy.on(['missing'], add))
+    with pytest.raises(LazyDict.CycleError) as exc:
+        lazy['a']
+    assert exc.value.cycle == ['a', 'c', 'b', 'a']
+    with pytest.raises(KeyError):
+        lazy['d']
+    assert not dict(lazy.items())
+
+    lazy = LazyDict(
+      (key, Lazy(add, key)) for key in range(4))
+    lazy['sum'] = Lazy.on(range(4), add)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        lazy.evaluate(executor=executor)
+    assert lazy['sum'] == 6
+
+
+def test_threadsafelazydict_requires():
+    """Test dependency-aware ThreadSafeLazyDict prefetching.
+    """
+    order = []
+    release = threading.Event()
+
+    def func(key, *args):
+        if key == 'slow':
+            release.wait()
+        order.append(key)
+        return (key,) + args
+
+    lazy = ThreadSafeLazyDict(
+      slow=Lazy(func, 'slow'), fast=Lazy(func, 'fast'),
+      both=Lazy.on(['slow', 'fast'], func, 'both'),
+      error=Lazy(int, 'error'), failed=Lazy.on(['error', 'fast'], func))
+    futures = lazy.prefetch()
+    assert sorted(futures) == ['both', 'error', 'failed', 'fast', 'slow']
+    assert futures['fast'].result() == ('fast',)
+    with pytest.raises(ValueError):
+        futures['failed'].result()
+    assert not futures['both'].done()
+    release.set()
+    assert lazy['both'] == ('both', ('slow',), ('fast',))
+    assert order == ['fast', 'slow', 'both']
+
+    lazy['fast'] = 'changed'
+    assert lazy.invalidate('fast') == ['both']
+    assert lazy['both'] == ('both', ('slow',), 'changed')
+    lazy['fast'] = Lazy.on(['both'], func)
+    assert lazy.invalidate('fast') == ['both']
+    with pytest.raises(ThreadSafeLazyDict.CycleError):
+        lazy.prefetch(['fast'])
+    with pytest.raises(ThreadSafeLazyDict.CycleError):
+        lazy['both']
+
+
+def test_boundedlazydict():
+    """Test BoundedLazyDict dropping and re-evaluating values.
+    """
+    calls = []
+
+    def func(*args):
+        calls.append(args)
+        return 'x' * sum(args)
+
+    class Dict(BoundedLazyDict):
+        maxsize = 2
+
+    lazy = Dict((key, Lazy(func, key)) for key in (1, 2, 3))
+    lazy['plain'] = 'plain'
+    assert lazy[1] == 'x' and lazy[2] == 'xx'
+    assert lazy[1] == 'x'  # 1 is now more recent than 2
+    assert lazy[3] == 'xxx'
+    assert calls == [(1,), (2,), (3,)]
+    assert lazy.evictions == 1
+    assert dict(lazy.items()) == {1: 'x', 3: 'xxx', 'plain': 'plain'}
+    assert lazy[2] == 'xx'
+    assert calls[-1] == (2,) and lazy.evictions == 2
+
+    lazy[3] = 'assigned'
+    assert lazy.call(1) == 'x'  # explicit results are kept
+    assert lazy[2] == 'xx' and lazy.evictions == 2
+
+    def join(*args):
+        calls.append(args)
+        return ''.join(args)
+
+    class Dict(BoundedLazyDict):
+        maxbytes = 2
+        sizeof = staticmethod(len)
+
+    lazy = Dict(
+      a=Lazy(func, 1), b=Lazy(func, 2), ab=Lazy.on(['a', 'b'], join))
+    del calls[:]
+    assert lazy['ab'] == 'xxx'
+    assert calls == [(1,), (2,), ('x', 'xx')]
+    assert lazy.nbytes == 0 and lazy.evictions == 3
+    lazy['a'] = 'a'
+    assert lazy.invalidate('a') == []  # ab was already dropped
+    assert lazy['ab'] == 'axx'
+
+
+def test_lazydict_views():
+    """Test the pending and resolved LazyDict key views.
+    """
+    lazy = LazyDict(a=Lazy(int, '1'), b=2)
+    lazy.update(c=Lazy(int, '3'), d=4)
+    lazy.setdefault('e', Lazy(int, '5'))
+    pending = lazy.pending_keys()
+    resolved = lazy.resolved_keys()
+    items = lazy.resolved_items()
+    assert pending == {'a', 'c', 'e'} and len(pending) == 3
+    assert resolved == {'b', 'd'} and len(resolved) == 2
+    assert items == {('b', 2), ('d', 4)}
+    assert 'a' not in resolved and 'x' not in resolved
+
+    assert lazy['a'] == 1
+    assert 'a' not in pending and 'a' in resolved and ('a', 1) in items
+    assert len(pending) == 2 and len(items) == 3
+    assert lazy.pop('c').func is int
+    del lazy['b']
+    lazy['d'] = Lazy(int, '4')
+    assert pending == {'d', 'e'} and items == {('a', 1)}
+    assert lazy.popitem()[0] in ('d', 'e')
+    lazy.clear()
+    assert not pending and not resolved
+
+    lazy |= {'x': Lazy(int, '6')}
+    assert pending == {'x'} and lazy['x'] == 6
+
+
+@pytest.mark.parametrize('lazydicttype', [
+  LazyDict, BoundedLazyDict, ThreadSafeLazyDict])
+def test_lazydict_pickle(lazydicttype):
+    """Test that LazyDicts keep tracking pending values after unpickling.
+    """
+    lazy = pickle.loads(pickle.dumps(
+      lazydicttype(a=Lazy(int, '1'), b=2)))
+    assert type(lazy) is lazydicttype
+    assert lazy.pending_keys() == {'a'} and lazy.resolved_keys() == {'b'}
+    assert lazy['a'] == 1 and lazy['b'] == 2
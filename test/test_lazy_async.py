@@ -0,0 +1,95 @@
+"""Test the moretools._lazy module's AsyncLazyDict.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import asyncio
+
+import pytest
+
+from moretools import Lazy, AsyncLazyDict
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_asynclazydict():
+    """Test AsyncLazyDict evaluating coroutine values only once.
+    """
+    calls = []
+
+    async def fetch(arg):
+        calls.append(arg)
+        await asyncio.sleep(0.01)
+        if arg is None:
+            raise ValueError(arg)
+        return arg
+
+    lazy = AsyncLazyDict(
+      one=Lazy(fetch, 1), two=Lazy(fetch, 2), error=Lazy(fetch, None),
+      sync=Lazy(int, '3'), plain=4)
+
+    async def main():
+        assert await asyncio.gather(*(lazy.get('one') for _ in range(8))) \
+          == [1] * 8
+        assert await lazy.gather('one', 'two', 'sync', 'plain') \
+          == [1, 2, 3, 4]
+        assert await lazy.get('missing', 'default') == 'default'
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                await lazy.get('error')
+
+    with pytest.raises(TypeError):
+        lazy['one']
+    run(main())
+    assert calls == [1, 2, None, None]
+    assert lazy['one'] == 1
+    assert dict(lazy.items()) == {'one': 1, 'two': 2, 'sync': 3, 'plain': 4}
+
+
+def test_asynclazydict_requires():
+    """Test AsyncLazyDict resolving required values first.
+    """
+    calls = []
+
+    async def fetch(*args):
+        calls.append(args)
+        await asyncio.sleep(0.01)
+        return sum(args)
+
+    lazy = AsyncLazyDict(
+      one=Lazy(fetch, 1), two=Lazy(fetch, 2), sync=Lazy.on(['one'], int),
+      sum=Lazy.on(['one', 'two', 'sync'], fetch, 10))
+
+    async def main(*keys):
+        return await lazy.gather(*keys)
+
+    assert run(main('sum', 'sum', 'one')) == [14, 14, 1]
+    assert sorted(calls) == [(1,), (2,), (10, 1, 2, 1)]
+    lazy['one'] = 2
+    assert sorted(lazy.invalidate('one')) == ['sum', 'sync']
+    assert run(main('sum')) == [16]
+
+
+def test_asynclazydict_get_errors():
+    """Test that AsyncLazyDict.get() only defaults for missing keys.
+    """
+    def fail():
+        raise KeyError('inner')
+
+    lazy = AsyncLazyDict(fail=Lazy(fail), needs=Lazy.on(['missing'], int))
+
+    async def get(key):
+        return await lazy.get(key, 'default')
+
+    assert run(get('other')) == 'default'
+    with pytest.raises(KeyError) as exc:
+        run(get('fail'))
+    assert exc.value.args == ('inner', )
+    with pytest.raises(KeyError):
+        run(get('needs'))
@@ -0,0 +1,280 @@
+"""Test the moretools._multidict and moretools._multisimpledict modules.
+
+.. moduleauthor:: Stefan Zimmermann <zimmermann.code@gmail.com>
+"""
+
+import pytest
+
+from moretools import (
+  simpledict, simpledictset, simpledictzip, SimpleDictZipType,
+  DictSet, DictZip, DictStruct, dictupdate)
+
+
+def test_contains():
+    """Test membership checks of multi-dict containers.
+    """
+    dictset = DictSet([{'a': 1}, {'b': 2}])
+    assert 'a' in dictset and 'b' in dictset and 'c' not in dictset
+    assert ['unhashable'] not in dictset
+    struct = DictStruct('struct', [{'a': 1}], b=2)
+    assert 'a' in struct and 'b' in struct and 'c' not in struct
+
+    SD = simpledict('SD')
+    one, two = SD(a=1), SD(b=2)
+    SDSet = simpledictset('SDSet')
+    sdset = SDSet([one, two])
+    assert ('a', 1) in sdset and ('b', 2) in sdset
+    assert ('a', 2) not in sdset and ('c', 1) not in sdset
+    assert 'a' not in sdset and (['unhashable'], 1) not in sdset
+    assert ('a', 1) not in SDSet([one, SD(a=1)]) # ambiguous
+    sdset = simpledictset('SDSet', iterate='keys')([one, two])
+    assert 'a' in sdset and 'c' not in sdset
+
+    sdzip = simpledictzip('SDZip')([SD(a=1, b=2), SD(a=3)])
+    assert ('a', (1, 3)) in sdzip and ('a', (1, 2)) not in sdzip
+    assert ('b', (2, None)) not in sdzip
+    assert dict(simpledictzip('SDZip')([SD(a=1), SD(a=3)])) == {'a': (1, 3)}
+
+
+def test_simpledictset_owners():
+    """Test the incrementally updated owners index of simpledictsets.
+    """
+    SD = simpledict('SD')
+    one, two = SD(a=1), SD(b=2)
+    SDSet = simpledictset('SDSet')
+    sdset = SDSet([one, two])
+    assert sdset['a'] == 1 and sdset.b == 2
+    two['c'] = 3
+    assert sdset['c'] == 3 and sdset.c == 3
+    sdset.c = 4
+    assert two.c == 4
+    del two['c']
+    with pytest.raises(KeyError):
+        sdset['c']
+    with pytest.raises(AttributeError):
+        sdset.c
+    one.b = 5
+    with pytest.raises(simpledictset.MultipleKeyError):
+        sdset['b']
+    with pytest.raises(simpledictset.MultipleAttributeError):
+        sdset.b
+    with pytest.raises(simpledictset.MultipleKeyError):
+        sdset['b'] = 6
+    del one.b
+    assert sdset['b'] == 2
+    one.__dict__ = {'d': 7}
+    assert sdset['d'] == 7
+    with pytest.raises(KeyError):
+        sdset['a']
+
+    # also updated by dictupdate()
+    dictupdate(two, z=5)
+    assert 'z' in SDSet.keys(sdset) and sdset['z'] == 5 and len(sdset) == 3
+    del two.z
+
+    # helpers don't shadow member attributes
+    assert SDSet([SD(_owners=1, owners=2)]).owners == 2
+    assert SDSet([SD(_owners=1)])._owners == 1
+
+    SDSet = simpledictset(
+      'SDSet', multiple_key_handler=lambda key, values: values)
+    assert SDSet([SD(a=1), SD(a=2)])['a'] == [1, 2]
+
+    SDSet = simpledictset('SDSet', unique=True)
+    with pytest.raises(simpledictset.MultipleKeyError):
+        SDSet([SD(a=1), SD(a=2)])
+    one, two = SD(a=1), SD(b=2)
+    sdset = SDSet([one, two])
+    with pytest.raises(simpledictset.MultipleKeyError):
+        one['b'] = 3
+    assert 'b' not in one.__dict__
+    with pytest.raises(simpledictset.MultipleKeyError):
+        one.__dict__ = {'b': 3}
+    assert one.__dict__ == {'a': 1}
+    one.a = 4
+    assert sdset.a == 4
+    # which can't be enforced for other members
+    with pytest.raises(ValueError):
+        SDSet([one, one])
+    with pytest.raises(TypeError):
+        SDSet([one, SD.struct('struct', [two])])
+    # unregistered when the simpledictset is gone
+    del sdset
+    one['b'] = 3
+
+    # members which are no basic simpledicts fall back to probing
+    struct = SD.struct('struct', [two])
+    sdset = simpledictset('SDSet')([one, struct])
+    assert sdset['a'] == 4
+    with pytest.raises(simpledictset.MultipleKeyError):
+        sdset['b']
+
+
+def test_simpledictzip_columnar():
+    """Test the cached columns of columnar simpledictzips.
+    """
+    SD = simpledict('SD')
+    one, two, three = SD(a=1, b='x'), SD(a=1, b='y'), SD(a=1, b='x', c=2)
+    SDZip = simpledictzip('SDZip', columnar=True)
+    sdzip = SDZip([one, two, three])
+    assert list(sdzip['a']) == [1, 1, 1] and list(sdzip.b) == ['x', 'y', 'x']
+    # returns the same cached column without copying
+    assert sdzip['a'] is sdzip['a']
+    with pytest.raises(KeyError):
+        sdzip['c']
+    with pytest.raises(AttributeError):
+        sdzip.c
+    assert sorted(key for key, _ in sdzip) == ['a', 'b'] and len(sdzip) == 2
+    assert ('a', (1, 1, 1)) in sdzip and ('a', (1, 1)) not in sdzip
+    assert 'a' not in sdzip and ('c', (2, )) not in sdzip
+    assert ('a', 5) not in sdzip and ('a', None) not in sdzip
+    assert list(SDZip.diff(sdzip)) == ['b']
+
+    # changes of zipped simpledicts drop the cached columns
+    two.a = 3
+    assert list(sdzip.a) == [1, 3, 1]
+    assert list(SDZip.diff(sdzip)) == ['a', 'b']
+    del two['a']
+    with pytest.raises(KeyError):
+        sdzip['a']
+    two.a = 1
+
+    selected = SDZip.select(sdzip, [0, 2])
+    assert type(selected) is SDZip and selected.__dicts__ == (one, three)
+    assert list(SDZip.diff(selected)) == []
+    assert list(SDZip.select(sdzip, slice(1, None)).b) == ['y', 'x']
+    selected = SDZip.select(sdzip, [False, True, True])
+    assert selected.__dicts__ == (two, three)
+    assert list(selected.b) == ['y', 'x']
+    # gaps in the selected columns are updated
+    with pytest.raises(KeyError):
+        SDZip.select(sdzip, [1, 2])['c']
+    assert list(SDZip.select(sdzip, [2])['c']) == [2]
+    # while selected columns stay valid until any selected one changes
+    three.b = 'z'
+    assert list(selected.b) == ['y', 'z']
+
+    SDZip = simpledictzip('SDZip', default_value=None, columnar=True)
+    sdzip = SDZip([one, three])
+    assert list(sdzip.c) == [None, 2]
+    assert list(SDZip.diff(sdzip)) == ['b', 'c']
+
+    # structs are zipped with their inherited items
+    struct = SD.struct('struct', [one], {'c': 3})
+    sdzip = SDZip([struct, three])
+    assert list(sdzip.c) == [3, 2] and list(sdzip.a) == [1, 1]
+    one.a = 4
+    assert list(sdzip.a) == [4, 1]
+
+    with pytest.raises(TypeError):
+        simpledictzip('SDZip', columnar=True, basetype=SimpleDictZipType)
+
+
+def test_simpledictzip_columnar_numpy():
+    """Test the numpy array columns of columnar simpledictzips.
+    """
+    numpy = pytest.importorskip('numpy')
+    SD = simpledict('SD')
+    SDZip = simpledictzip('SDZip', columnar=True)
+    sdzip = SDZip([SD(a=1, b=[1], c='x'), SD(a=2, b=[2], c=1)])
+    assert sdzip.a.dtype == numpy.array([1]).dtype
+    assert sdzip.b.dtype == object and sdzip.b[0] == [1]
+    assert sdzip.c.dtype == object
+    with pytest.raises(ValueError): # read-only
+        sdzip.a[0] = 3
+    assert list(SDZip.diff(sdzip)) == ['a', 'b', 'c']
+    selected = SDZip.select(sdzip, slice(1, None))
+    assert numpy.shares_memory(selected.a, sdzip.a)
+    selected = SDZip.select(sdzip, numpy.array([True, False]))
+    assert list(selected.a) == [1]
+
+
+def test_key_union():
+    """Test the maintained key union of multi-simpledict containers.
+    """
+    SD = simpledict('SD')
+    Fields = simpledict('Fields', fields=['a', 'c'])
+    one, two, three = SD(a=1, b=2), SD(b=3), Fields(c=4)
+    for sdmulti in [
+      simpledictset('SDSet', iterate='keys')([one, two, three]),
+      simpledictzip('SDZip', iterate='keys')([one, two, three]),
+      ]:
+        assert len(sdmulti) == 3 and sorted(sdmulti) == ['a', 'b', 'c']
+        assert 'a' in sdmulti and 'd' not in sdmulti
+        one.d = 5
+        three.a = 6
+        three.a = 7 # only counted once
+        assert len(sdmulti) == 4 and 'd' in sdmulti
+        del one.a
+        assert 'a' in sdmulti # still in `three`
+        del three.a
+        assert 'a' not in sdmulti
+        del two['b']
+        assert 'b' in sdmulti # still in `one`
+        one.__dict__ = {'e': 8}
+        assert sorted(sdmulti) == ['c', 'e']
+        one.__dict__, two.__dict__ = {'a': 1, 'b': 2}, {'b': 3}
+        assert len(sdmulti) == 3 and sorted(sdmulti) == ['a', 'b', 'c']
+        # changes while iterating
+        for key in sdmulti:
+            two[key * 2] = None
+        for key in sdmulti:
+            if len(key) == 2:
+                del two[key]
+        assert sorted(sdmulti) == ['a', 'b', 'c']
+        # members can only be replaced as a whole
+        with pytest.raises(AttributeError):
+            sdmulti.__dicts__.append(SD(z=1))
+        sdmulti.__dicts__ = sdmulti.__dicts__ + (SD(z=1), )
+        assert len(sdmulti) == 4 and 'z' in sdmulti
+        assert sorted(sdmulti) == ['a', 'b', 'c', 'z']
+
+    # duplicate members and members which are no simpledicts
+    # fall back to computing the union
+    sdzip = simpledictzip('SDZip', iterate='keys')([one, one])
+    assert sdzip.__keys__ is None
+    assert sorted(sdzip) == ['a', 'b'] and 'a' in sdzip and len(sdzip) == 2
+    class Other(object):
+        def __init__(self, **items):
+            self.__dict__.update(items)
+
+    other = Other(b=1, f=2)
+    sdzip = simpledictzip('SDZip', iterate='keys')([one, other])
+    assert sdzip.__keys__ is None
+    assert sorted(sdzip) == ['a', 'b', 'f'] and 'f' in sdzip
+    assert sdzip['b'] == (2, 1) and len(sdzip) == 3
+
+
+def test_frozen_and_fields_members():
+    """Test multi-simpledict containers of simpledicts
+       without a per-instance `__dict__` storage.
+    """
+    SD = simpledict('SD')
+    Fields = simpledict('Fields', fields=['x', 'y'])
+    for members in [
+      [SD.frozen(x=1), SD.frozen(x=2)],
+      [Fields(x=1), Fields(x=2)],
+      [Fields.frozen(x=1), Fields.frozen(x=2)],
+      ]:
+        sdzip = simpledictzip('SDZip')(members)
+        assert sdzip['x'] == (1, 2) and sdzip.x == (1, 2)
+        assert dict(sdzip) == {'x': (1, 2)} and ('x', (1, 2)) in sdzip
+        # also without a maintained key union
+        sdzip = simpledictzip('SDZip')(members[:1] * 2)
+        assert sdzip['x'] == (1, 1) and dict(sdzip) == {'x': (1, 1)}
+        assert ('x', (1, 1)) in sdzip
+
+        sdset = simpledictset('SDSet')(members[1:])
+        assert sdset['x'] == 2 and sdset.x == 2 and ('x', 2) in sdset
+        sdset = simpledictset('SDSet')(members[1:] * 2)
+        with pytest.raises(simpledictset.MultipleKeyError):
+            sdset['x']
+        assert ('y', 2) not in sdset
+
+    fields = Fields(x=1)
+    sdset = simpledictset('SDSet')([fields, fields])
+    with pytest.raises(simpledictset.MultipleKeyError):
+        sdset['x'] = 3
+    sdset = simpledictset('SDSet')([fields, SD(y=2)])
+    sdset['x'] = 3
+    assert fields.x == 3
@@ -13,6 +13,7 @@ from moretools import (
   issimplefrozendict, issimplefrozendictclass,
   issimpledictstruct, issimpledictstructclass,
   )
+from moretools import dictkeys, dictvalues, dictitems, dictupdate
 from moretools._simpledict import (
   SimpleDictType, SimpleFrozenDictType, SimpleDictStructType,
   )
@@ -97,3 +98,277 @@ def test_simpledict():
     assert not hasattr(SD, 'frozen')
     assert not hasattr(SD, 'struct')
     check_class(SD, 'SD')
+
+
+def test_memo():
+    """Test memoizing of validated key<-->attrname conversions.
+    """
+    SD = simpledict(
+      'SD', key_to_attr=lambda key: key.replace('-', '_'),
+      attr_to_key=lambda name: name.replace('_', '-'), memosize=2)
+    assert SD.memo is SD.frozen.memo is SD.struct.memo
+    sd = SD({'a-b': 1})
+    sd['a-b'] = 2
+    sd['c'] = 3
+    sd.a_b = 4
+    assert (SD.memo.hits, SD.memo.misses) == (2, 3)
+    assert sd['a-b'] == 4
+    sd['d'] = 5  # drops the oldest
+    assert list(SD.memo.attrnames) == ['c', 'd']
+
+    with pytest.raises(simpledict.KeyToAttrError):
+        sd['1'] = None
+    with pytest.raises(simpledict.KeyToAttrToKeyMismatch):
+        sd['a_b'] = None
+    assert '1' not in SD.memo.attrnames and 'a_b' not in SD.memo.attrnames
+
+    SD = simpledict('SD')
+    with pytest.raises(simpledict.KeyToAttrError):
+        SD()[('unhashable', [])] = None
+    SD = simpledict('SD', memosize=None)
+    SD(a=1)['b'] = 2
+    assert SD.memo is None
+
+
+def test_from_records():
+    """Test batch construction with from_records() and fromkeys().
+    """
+    SD = simpledict('SD')
+    sds = SD.from_records([{'a': 1}, {'a': 2, 'b': 3}])
+    assert [type(sd) for sd in sds] == [SD, SD]
+    assert sds[1].a == 2 and sds[1].b == 3 and len(sds[0]) == 1
+    # every key is validated only once
+    assert SD.memo.misses == 2
+    sds[0].c = 4
+    assert dict(sds[0]) == {'a': 1, 'c': 4}
+
+    sds = SD.frozen.from_records([(1, 2), (3, 4)], keys='ab')
+    assert [dict(sd) for sd in sds] == [{'a': 1, 'b': 2}, {'a': 3, 'b': 4}]
+    with pytest.raises(NotImplementedError):
+        sds[0].a = 0
+    with pytest.raises(ValueError):
+        SD.from_records([(1, 2, 3)], keys='ab')
+    with pytest.raises(simpledict.KeyToAttrError):
+        SD.from_records([{'a': 1}, {'b c': 2}])
+
+    assert dict(SD.fromkeys('ab', 0)) == {'a': 0, 'b': 0}
+    with pytest.raises(simpledict.KeyToAttrError):
+        SD.fromkeys(['1'])
+    with pytest.raises(TypeError):
+        SD.struct.fromkeys('ab')
+
+
+def test_fields():
+    """Test fixed-schema simpledict() types with `fields`.
+    """
+    SD = simpledict('SD', fields=['a', 'b-c'], iterate='keys',
+                    key_to_attr=lambda key: key.replace('-', '_'),
+                    attr_to_key=lambda name: name.replace('_', '-'))
+    assert issubclass(SD, simpledict.fieldsbase) and issimpledictclass(SD)
+    assert SD.fields == ('a', 'b-c') and not hasattr(SD, 'struct')
+    sd = SD({'b-c': 2})
+    assert not hasattr(sd, 'a') and 'a' not in dir(sd) and len(sd) == 1
+    sd.a = 1
+    assert sd['a'] == 1 and sd.b_c == 2 and list(sd) == ['a', 'b-c']
+    sd['b-c'] = 3
+    del sd.a
+    assert repr(sd) == "simpledict({'b-c': 3})"
+    with pytest.raises(KeyError):
+        del sd['a']
+    with pytest.raises(simpledict.UnknownKeyError):
+        sd['d'] = 4
+    with pytest.raises(simpledict.UnknownKeyError):
+        sd.d = 4
+    with pytest.raises(AttributeError):
+        sd.d
+
+    sd = SD.frozen(a=1)
+    assert issimplefrozendict(sd) and sd.a == 1
+    with pytest.raises(NotImplementedError):
+        sd.a = 2
+
+    SD = simpledict('SD', fields=['a'], unknown_keys=True)
+    sd = SD(a=1, b=2)
+    sd['c'] = 3
+    assert dict(sd) == {'a': 1, 'b': 2, 'c': 3} and len(sd) == 3
+    assert [dict(sd) for sd in SD.from_records([(1, 2)], keys='ab')] \
+      == [{'a': 1, 'b': 2}]
+    with pytest.raises(simpledict.KeyToAttrError):
+        sd['d e'] = 4
+    with pytest.raises(simpledict.KeyToAttrError):
+        simpledict('SD', fields=['a b'])
+    assert dict(dictitems(sd)) == {'a': 1, 'b': 2, 'c': 3}
+    assert set(dictkeys(dictupdate(sd, {'a': 0}, d=4))) == set('abcd')
+    assert sorted(dictvalues(sd)) == [0, 2, 3, 4]
+
+
+def test_contains():
+    """Test hashed membership checks for the `iterate` modes.
+    """
+    sd = simpledict('SD')(a=1, b=[2])
+    assert ('a', 1) in sd and ('b', [2]) in sd
+    assert ('a', 2) not in sd and ('c', 1) not in sd and 'a' not in sd
+    assert (['unhashable'], 1) not in sd and ('a', 1, 2) not in sd
+    sd = simpledict('SD', iterate='keys')(a=1)
+    assert 'a' in sd and 'b' not in sd and ['unhashable'] not in sd
+    sd = simpledict('SD', iterate='values')(a=1)
+    assert 1 in sd and 'a' not in sd
+    sd = simpledict('SD', fields=['a', 'b'], iterate='keys')(a=1)
+    assert 'a' in sd and 'b' not in sd and 'c' not in sd
+
+
+def test_struct():
+    """Test item inheritance of <simpledict class>.struct instances.
+    """
+    SD = simpledict('SD')
+    base = SD(a=1, b=1)
+    middle = SD.struct('middle', [base], {'b': 2, 'c': 2})
+    other = SD(a=3, d=3)
+    struct = SD.struct('struct', [middle, other], {'e': 4})
+    assert dict(struct) == {'a': 1, 'b': 2, 'c': 2, 'd': 3, 'e': 4}
+    assert struct['a'] == 1 and ('d', 3) in struct and ('a', 3) not in struct
+
+    # changes anywhere in the chain are seen at once
+    base.a = 0
+    assert struct['a'] == 0
+    del middle['b']
+    assert struct['b'] == 1
+    other['f'] = 5
+    struct.e = 6
+    dictupdate(other, d=3)
+    assert dict(struct) == {
+      'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 6, 'f': 5}
+    struct.__bases__ = (other, )
+    assert dict(struct) == {'a': 3, 'd': 3, 'e': 6, 'f': 5}
+    dictupdate(other, a=4)
+    assert struct['a'] == 4
+    with pytest.raises(KeyError):
+        struct['b']
+
+    # other mappings as bases are just looked up directly
+    struct = SD.struct('struct', [{'a': 1}])
+    assert struct['a'] == 1 and dict(struct) == {'a': 1}
+
+
+def test_struct_call():
+    """Test creating simpledicts from <simpledict class>.struct instances.
+    """
+    SD = simpledict('SD')
+    assert SD.plain is SD and SD.struct.plain is SD
+    base = SD(a=1, b=1)
+    struct = SD.struct('struct', [base], {'b': 2})
+    sd = struct()
+    assert type(sd) is SD and dict(sd) == {'a': 1, 'b': 2}
+    misses = SD.memo.misses
+    frozen = struct(frozen=True)
+    assert type(frozen) is SD.frozen and dict(frozen) == {'a': 1, 'b': 2}
+    assert SD.memo.misses == misses  # nothing validated again
+
+    # results are independent from later changes
+    sd.c = 3
+    base.a = 0
+    assert dict(struct) == {'a': 0, 'b': 2}
+    assert dict(sd) == {'a': 1, 'b': 2, 'c': 3}
+    assert dict(frozen) == {'a': 1, 'b': 2}
+
+    struct = SD.struct('struct', [{'a': 1}])
+    assert dict(struct()) == {'a': 1}
+    with pytest.raises(simpledict.KeyToAttrError):
+        SD.struct('struct', [{'a b': 1}])()
+
+    # simpledict bases with other conversions need validation
+    Up = simpledict('Up', key_to_attr=str.lower, attr_to_key=str.upper)
+    with pytest.raises(simpledict.KeyToAttrToKeyMismatch):
+        Up({'a': 1})
+    with pytest.raises(simpledict.KeyToAttrToKeyMismatch):
+        Up.struct('struct', [SD(a=1)])()
+    assert dict(Up.struct('struct', [SD(A=1)])()) == {'A': 1}
+
+
+def test_struct_flattened():
+    """Test the invalidation of cached flattened <simpledict class>.struct
+       items.
+    """
+    import gc
+    from moretools import _simpledict
+
+    SD = simpledict('SD')
+    first, second = SD(a=1), SD(b=2)
+    struct = SD.struct('struct', [first, second])
+    assert dict(struct()) == {'a': 1, 'b': 2}
+    assert id(struct) in _simpledict._flattened
+    first.a = 0
+    assert id(struct) not in _simpledict._flattened
+    # unregistered from all other bases as well
+    for obj in [struct, first, second]:
+        assert id(struct) not in _simpledict._flatteners.get(id(obj), ())
+    assert dict(struct()) == {'a': 0, 'b': 2}
+
+    structid = id(struct)
+    del struct
+    gc.collect()
+    assert structid not in _simpledict._flattened
+    for obj in [first, second]:
+        assert structid not in _simpledict._flatteners.get(id(obj), ())
+def test_frozen():
+    """Test hashable <simpledict class>.frozen instances.
+    """
+    SD = simpledict('SD')
+    frozen = SD.frozen(a=1, b=2)
+    assert frozen == SD.frozen(b=2, a=1) and frozen != SD.frozen(a=1)
+    assert hash(frozen) == hash(SD.frozen(b=2, a=1))
+    assert {frozen: 'value'}[SD.frozen(a=1, b=2)] == 'value'
+    for change in [lambda: setattr(frozen, 'a', 0),
+                   lambda: frozen.__setitem__('a', 0),
+                   lambda: delattr(frozen, 'a'),
+                   lambda: frozen.__delitem__('a')]:
+        with pytest.raises(NotImplementedError):
+            change()
+
+    changed = SD.frozen.set(frozen, 'c', 3)
+    assert dict(changed) == {'a': 1, 'b': 2, 'c': 3} and changed.c == 3
+    assert dict(frozen) == {'a': 1, 'b': 2}
+    assert hash(changed) == hash(SD.frozen(a=1, b=2, c=3))
+    assert SD.set(changed, 'c', 3) is changed
+    removed = SD.remove(changed, 'c')
+    assert removed == frozen and hash(removed) == hash(frozen)
+    with pytest.raises(KeyError):
+        SD.remove(frozen, 'c')
+    with pytest.raises(simpledict.KeyToAttrError):
+        SD.set(frozen, 'c d', 3)
+    with pytest.raises(TypeError):
+        SD.set(SD(a=1), 'b', 2)
+    with pytest.raises(TypeError):
+        hash(SD.frozen(a=[]))
+    assert ('a', 1) in frozen and 'a' in dir(frozen) and len(frozen) == 2
+
+    SD = simpledict('SD', fields=['a', 'b'])
+    frozen = SD.frozen(a=1)
+    assert hash(SD.set(frozen, 'b', 2)) == hash(SD.frozen(a=1, b=2))
+    assert SD.remove(SD.frozen(a=1, b=2), 'b') == frozen
+
+
+# module level for pickle to find the classes
+Pickled = simpledict('Pickled')
+Pickled.__module__ = Pickled.frozen.__module__ = __name__
+
+
+def test_frozen_copy():
+    """Test copying and pickling <simpledict class>.frozen instances.
+    """
+    import copy
+    import pickle
+
+    frozen = Pickled.frozen(a=1, b=[2])
+    copied = copy.copy(frozen)
+    assert copied == frozen and copied.b is frozen.b
+    deepcopied = copy.deepcopy(frozen)
+    assert deepcopied == frozen and deepcopied.b is not frozen.b
+    assert type(deepcopied) is Pickled.frozen
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        pickled = pickle.loads(pickle.dumps(frozen, protocol))
+        assert pickled == frozen and type(pickled) is Pickled.frozen
+
+    SD = simpledict('SD', fields=['a', 'b'])
+    frozen = SD.frozen(a=1, b=[2])
+    assert copy.copy(frozen) == frozen == copy.deepcopy(frozen)